@@ -5,45 +5,159 @@ SOURCE CODE AS SINGLE SOURCE OF TRUTH
 All data comes from compiled AuthScript policies
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from compiler.semantic_analyzer import SemanticAnalyzer
 from compiler.lexer import SPLLexer
-from compiler.parser import SPLParser
-from compiler.ast_nodes import ASTPrinter, ASTVisitor
+from compiler.parser import SPLParser, TokenRecorder
+from compiler.code_generator import CodeGenerator
+from compiler.ast_nodes import ASTPrinter, ASTSerializer, RoleNode, UserNode, ResourceNode
+import gzip
+import hashlib
+import itertools
 import json
+import os
+import re
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+from werkzeug.exceptions import HTTPException
+
+# orjson parses large compiled policy blobs several times faster than json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# msgspec decodes and type-checks the check-access body in one C pass
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
 
 # Import database and execution engine
 try:
-    from database.db_manager import DatabaseManager
+    from database.db_manager import AuditLogWriter, DatabaseManager
     from execution.policy_engine import PolicyEngine
     DB_AVAILABLE = True
 except ImportError:
     DB_AVAILABLE = False
     print("Warning: Database not available. Policies will not be persisted.")
 
+# Users and resources are declared with SPL identifiers (see SPLLexer.t_IDENTIFIER),
+# so any other name can be rejected without a cache or database lookup
+_IDENTIFIER_RE = re.compile(r'\A[a-zA-Z_][a-zA-Z0-9_]*\Z')
+# Parser errors read "Syntax error at line N: <message>" (see SPLParser.p_error)
+_PARSE_ERROR_RE = re.compile(r'line\s+(\d+)\s*:\s*(.*)', re.S)
+
 # Create single Blueprint for all routes
 api = Blueprint('api', __name__, url_prefix='/api')
 
-# Initialize compiler components
+# Initialize compiler components. PLY's master regex and LALR tables are
+# built once here; tokenize() and parse() reset their own state per call.
+# That state (input position, line counter, parser.errors) lives on the
+# shared instances, so calls hold _front_end_lock. Lexing and parsing are
+# pure CPU under the GIL, so the lock costs threaded servers no parallelism.
 lexer = SPLLexer()
+lexer.build()
 parser = SPLParser()
+parser.build()
+_front_end_lock = threading.Lock()
+# The analyzer keeps its symbol table and results on the instance, so
+# threaded servers give each thread its own (see get_analyzer)
+_thread_analyzers = threading.local()
+SUPPORTED_FORMATS = CodeGenerator().get_supported_formats()
+
+# Database and audit writer are opened by init_database() when the blueprint
+# is registered on an app, so importing this module touches no files or threads.
+# Every request then shares the same connection pool.
+db = None
+# Access checks hand their audit rows to a background batch writer
+audit_writer = None
+_current_engine = None
+# Built engines by compiled_policies.id; a stored version never changes, so
+# an engine only has to be parsed and indexed the first time it is activated
+_engine_cache = {}
+# Held while building a missing engine, so concurrent first requests for
+# the same version wait for one build instead of each parsing the policy
+_engine_lock = threading.Lock()
+# Database rebuilds run one at a time on this worker (see init_database);
+# /compile?async=1 returns a job ID instead of waiting for its rebuild
+db_executor = None
+# Recent rebuild futures by job ID, oldest first
+DB_JOB_HISTORY = 64
+_db_jobs = OrderedDict()
 
-# Initialize database if available
-if DB_AVAILABLE:
-    db = DatabaseManager()
-    _current_engine = None
-else:
-    db = None
-    _current_engine = None
+# In-process cache for read-only endpoints: key -> (stored_at, payload or JSON bytes)
+READ_CACHE_TTL = 60
+# Unknown usernames/resource names are remembered briefly so repeated
+# lookups for the same missing name skip the database. They are kept apart
+# from _read_cache, in a smaller LRU, so a stream of made-up names cannot
+# push real payloads out
+LOOKUP_MISS_TTL = 5
+LOOKUP_MISS_CACHE_SIZE = 256
+# Health probes arrive every second or so; one status snapshot serves them all
+HEALTH_CACHE_TTL = 1
+# Bodies below this are sent uncompressed; gzip framing would eat the saving
+GZIP_MIN_SIZE = 2048
+# Largest ?limit= served by /execution/audit-logs
+AUDIT_LOG_MAX_LIMIT = 10000
+# Largest ?limit= served by /execution/policies/<name>/history
+POLICY_HISTORY_MAX_LIMIT = 500
+# Keys include usernames and resource names from the URL, so the cache is
+# bounded and forgets its least recently used entries first
+READ_CACHE_SIZE = 1024
+_read_cache = OrderedDict()
+_lookup_misses = OrderedDict()
+# Guards both caches
+_read_cache_lock = threading.Lock()
 
+# Compiler front-end results by source hash, least recently used first.
+# Tokens, AST and semantic analysis depend only on the source text, so a
+# resubmitted document (autosave, re-validation, retries) skips straight
+# to building the response
+COMPILE_CACHE_SIZE = 256
+_compile_cache = OrderedDict()
+# Guards the LRU bookkeeping; concurrent eviction would break move_to_end
+_compile_cache_lock = threading.Lock()
+# (source key, response) of the last compile that repopulated the database;
+# resubmitting the same source then leaves the database as it is.
+# Cleared whenever a rebuild is queued or starts, and only the most
+# recently queued rebuild may set it again
+_last_compile = (None, None)
+_rebuild_generation = 0
+_rebuild_lock = threading.Lock()
 
-class SPLDataExtractor(ASTVisitor):
-    """Extract users, resources, and policies from AST for database population"""
+# Endpoints registered with @requires_db
+_DB_VIEWS = set()
+# Endpoints whose clients read a flag other than "success" on failure;
+# the frontend checks validationResult.valid (see api_unhandled_exception)
+_ERROR_FLAGS = {'api.validate': 'valid'}
+
+
+class SPLDataExtractor:
+    """
+    Extract users, resources, and roles from AST for database population
+    Declarations are always top-level statements, so extract() makes one
+    pass over them and never descends into policy conditions
+    """
     def __init__(self):
         self.users = []
         self.resources = []
         self.roles = {}
     
+    def extract(self, program):
+        """Collect declarations from a ProgramNode's statements"""
+        for statement in program.statements:
+            handler = self._HANDLERS.get(type(statement))
+            if handler:
+                handler(self, statement)
+    
     def visit_RoleNode(self, node):
         """Extract role information"""
         self.roles[node.name] = node.properties
@@ -69,20 +183,11 @@ class SPLDataExtractor(ASTVisitor):
         }
         self.resources.append(resource_data)
     
-    def visit_PolicyNode(self, node):
-        pass
-    
-    def visit_BinaryOpNode(self, node):
-        pass
-    
-    def visit_UnaryOpNode(self, node):
-        pass
-    
-    def visit_AttributeNode(self, node):
-        pass
-    
-    def visit_LiteralNode(self, node):
-        pass
+    _HANDLERS = {
+        RoleNode: visit_RoleNode,
+        UserNode: visit_UserNode,
+        ResourceNode: visit_ResourceNode
+    }
 
 
 # ============================================================================
@@ -90,77 +195,464 @@ class SPLDataExtractor(ASTVisitor):
 # ============================================================================
 
 def get_db():
-    """Get database manager instance"""
-    global db
-    if db is None and DB_AVAILABLE:
-        db = DatabaseManager()
+    """Get the shared database manager, or None if the database is unavailable"""
     return db
 
 
+def requires_db(view):
+    """Mark a route as needing the database; see require_database()"""
+    _DB_VIEWS.add(f'{api.name}.{view.__name__}')
+    return view
+
+
+def requires_code(view):
+    """
+    Read the JSON body of a compiler route and call view(source_code, data)
+    Bodies without a string 'code' field are rejected with a 400
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        data = read_json_body()
+        if not data or 'code' not in data:
+            return jsonify({
+                "success": False,
+                "error": "Missing 'code' field in request body"
+            }), 400
+        
+        source_code = data['code']
+        if not isinstance(source_code, str):
+            return jsonify({
+                "success": False,
+                "error": "'code' must be a string"
+            }), 400
+        
+        return view(source_code, data, *args, **kwargs)
+    return wrapper
+
+
+def cached_payload(key, producer, miss_ttl=None, ttl=READ_CACHE_TTL):
+    """
+    Return producer() memoized under key for ttl seconds
+    None results (e.g. unknown user) are only cached when miss_ttl is
+    given, and then only for miss_ttl seconds
+    """
+    now = time.monotonic()
+    with _read_cache_lock:
+        for cache, max_age in ((_read_cache, ttl), (_lookup_misses, miss_ttl)):
+            entry = cache.get(key)
+            if entry is None:
+                continue
+            if max_age is not None and now - entry[0] < max_age:
+                cache.move_to_end(key)
+                return entry[1]
+            del cache[key]
+    
+    payload = producer()
+    if payload is None and not miss_ttl:
+        return None
+    
+    if payload is None:
+        cache, size = _lookup_misses, LOOKUP_MISS_CACHE_SIZE
+    else:
+        cache, size = _read_cache, READ_CACHE_SIZE
+    with _read_cache_lock:
+        cache[key] = (now, payload)
+        cache.move_to_end(key)
+        if len(cache) > size:
+            cache.popitem(last=False)
+    return payload
+
+
+def cached_json_response(key, producer, ttl=READ_CACHE_TTL):
+    """
+    Serve producer()'s payload as JSON, reusing the serialized body and
+    its ETag for ttl seconds instead of re-encoding on every hit
+    Returns None, uncached, when producer() has nothing to serve
+    """
+    def encode():
+        payload = producer()
+        if payload is None:
+            return None
+        body = current_app.json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return body, hashlib.blake2b(body, digest_size=16, usedforsecurity=False).hexdigest()
+    
+    entry = cached_payload(key, encode, ttl=ttl)
+    if entry is None:
+        return None
+    body, etag = entry
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return make_conditional(response)
+
+
+def conditional_jsonify(payload):
+    """jsonify payload with a content ETag so clients can revalidate it"""
+    response = jsonify(payload)
+    response.add_etag()
+    return make_conditional(response)
+
+
+def make_conditional(response):
+    """
+    Ask clients to revalidate on every use and answer 304 Not Modified
+    when their If-None-Match still matches
+    """
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def invalidate_read_cache(*keys):
+    """Drop the given cache keys, or everything when called without keys"""
+    with _read_cache_lock:
+        if not keys:
+            _read_cache.clear()
+            _lookup_misses.clear()
+            return
+        for key in keys:
+            _read_cache.pop(key, None)
+            _lookup_misses.pop(key, None)
+
+
+def parse_json(raw):
+    """Parse a JSON document (str or bytes), using orjson when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def read_json_body():
+    """
+    Decode the request body as a JSON object
+    The raw body is not cached on the request; empty, malformed or
+    non-object bodies yield None
+    """
+    raw = request.get_data(cache=False)
+    if not raw:
+        return None
+    try:
+        data = parse_json(raw)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+if MSGSPEC_AVAILABLE:
+    class AccessRequest(msgspec.Struct):
+        """Body of POST /execution/check-access"""
+        username: str = ''
+        action: str = ''
+        resource: str = ''
+        context: dict = {}
+
+    _access_request_decoder = msgspec.json.Decoder(AccessRequest)
+
+
+def read_access_request():
+    """
+    Decode a check-access body into (username, action, resource, context)
+    Malformed or mistyped bodies come back with empty fields, which the
+    route reports as missing
+    """
+    if MSGSPEC_AVAILABLE:
+        try:
+            req = _access_request_decoder.decode(request.get_data(cache=False))
+        except msgspec.DecodeError:
+            return None, None, None, {}
+        return req.username, req.action, req.resource, req.context
+    
+    # Same rules as AccessRequest: fields default to '' and {}, and a field
+    # of the wrong type rejects the whole body
+    data = read_json_body()
+    if data is None:
+        return None, None, None, {}
+    fields = tuple(data.get(name, '') for name in ('username', 'action', 'resource'))
+    context = data.get('context', {})
+    if not all(isinstance(field, str) for field in fields) or not isinstance(context, dict):
+        return None, None, None, {}
+    return (*fields, context)
+
+
+@lru_cache(maxsize=256)
+def _stored_policy_row(policy_id, include_body):
+    """
+    A stored policy version's columns as a tuple of (name, value) pairs
+    Versions are immutable per ID, so rows are memoized until the policy
+    table is rebuilt (see clear_and_populate_database). A missing ID
+    raises KeyError and database errors propagate, so neither is cached.
+    """
+    columns = '*' if include_body else DatabaseManager.POLICY_SUMMARY_COLUMNS
+    with get_db().get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT {columns} FROM compiled_policies WHERE id = ?', (policy_id,))
+        policy = cursor.fetchone()
+    
+    if not policy:
+        raise KeyError(policy_id)
+    return tuple(dict(policy).items())
+
+
+def load_policy_details(policy_id, include_body=False):
+    """
+    Load a stored policy version, with source_code and parsed compiled_json
+    only when include_body is set, or None if there is no such version
+    Each call returns a new dict the caller is free to modify
+    """
+    try:
+        policy_dict = dict(_stored_policy_row(policy_id, include_body))
+    except KeyError:
+        return None
+    
+    if include_body:
+        try:
+            policy_dict['compiled_json'] = parse_json(policy_dict['compiled_json'])
+        except ValueError:
+            # Not valid JSON; serve the stored text as it is
+            pass
+    return policy_dict
+
+
+def source_key(source_code):
+    """128-bit content hash identifying a source document"""
+    return hashlib.blake2b(source_code.encode('utf-8'), digest_size=16, usedforsecurity=False).digest()
+
+
+def compile_cache_entry(source_code):
+    """Cache slot for this source; each stage stores its result on first use"""
+    key = source_key(source_code)
+    with _compile_cache_lock:
+        entry = _compile_cache.get(key)
+        if entry is None:
+            entry = _compile_cache[key] = {}
+            if len(_compile_cache) > COMPILE_CACHE_SIZE:
+                _compile_cache.popitem(last=False)
+        else:
+            _compile_cache.move_to_end(key)
+    return entry
+
+
+def lex_source(source_code):
+    """Raw (type, value, line) tuples for source_code"""
+    entry = compile_cache_entry(source_code)
+    if 'lexed' not in entry:
+        with _front_end_lock:
+            entry['lexed'] = lexer.tokenize(source_code)
+    return entry['lexed']
+
+
+def token_text(value):
+    """Token value as served to clients; only NUMBER tokens are not already str"""
+    return value if type(value) is str else str(value)
+
+
+def tokenize_source(source_code):
+    """Token list for source_code, as returned by /tokenize and /compile"""
+    entry = compile_cache_entry(source_code)
+    if 'tokens' not in entry:
+        entry['tokens'] = [
+            {
+                "type": token_type,
+                "value": token_text(value),
+                "line": line
+            }
+            for token_type, value, line in lex_source(source_code)
+        ]
+    return entry['tokens']
+
+
+def token_columns(source_code):
+    """Tokens as parallel type/value/line arrays, for /tokenize?compact=1"""
+    entry = compile_cache_entry(source_code)
+    if 'token_columns' not in entry:
+        lexed = lex_source(source_code)
+        types, values, lines = zip(*lexed) if lexed else ((), (), ())
+        entry['token_columns'] = {
+            "types": list(types),
+            "values": list(map(token_text, values)),
+            "lines": list(lines)
+        }
+    return entry['token_columns']
+
+
+def tokenization_stage(source_code, include_tokens):
+    """/compile tokenization stage; the token list is only built when asked for"""
+    return {
+        "success": True,
+        "token_count": len(lex_source(source_code)),
+        "tokens": tokenize_source(source_code) if include_tokens else None
+    }
+
+
+def parse_source(source_code):
+    """(ast, errors) for source_code; ast is None when parsing failed"""
+    entry = compile_cache_entry(source_code)
+    if 'ast' not in entry:
+        # Keep the tokens the parser reads so /compile does not lex twice
+        recorder = TokenRecorder() if 'lexed' not in entry else None
+        with _front_end_lock:
+            ast = parser.parse(source_code, recorder=recorder)
+            parse_errors = list(parser.errors)
+        if recorder is not None and recorder.complete:
+            entry['lexed'] = recorder.tokens
+        # 'ast' marks the slot as filled for other threads, so it goes last
+        entry['parse_errors'] = parse_errors
+        entry['ast'] = ast
+    return entry['ast'], entry['parse_errors']
+
+
+def ast_text(source_code):
+    """String form of the parsed AST for source_code"""
+    entry = compile_cache_entry(source_code)
+    if 'ast_text' not in entry:
+        entry['ast_text'] = str(parse_source(source_code)[0])
+    return entry['ast_text']
+
+
+def ast_tree(source_code):
+    """Structured (one dict per node) form of the parsed AST for source_code"""
+    entry = compile_cache_entry(source_code)
+    if 'ast_tree' not in entry:
+        entry['ast_tree'] = ASTSerializer().visit(parse_source(source_code)[0])
+    return entry['ast_tree']
+
+
+def ast_output(source_code):
+    """The AST as served by /parse and /compile: text, or the tree with ?tree=1"""
+    return ast_tree(source_code) if query_flag('tree') else ast_text(source_code)
+
+
+def get_analyzer():
+    """This thread's SemanticAnalyzer, created on first use"""
+    analyzer = getattr(_thread_analyzers, 'analyzer', None)
+    if analyzer is None:
+        analyzer = _thread_analyzers.analyzer = SemanticAnalyzer()
+    return analyzer
+
+
+def analyze_source(source_code):
+    """Semantic analysis results for source_code, which must parse"""
+    entry = compile_cache_entry(source_code)
+    if 'semantics' not in entry:
+        analyzer = get_analyzer()
+        analyzer.reset()
+        entry['semantics'] = analyzer.analyze(parse_source(source_code)[0])
+    return entry['semantics']
+
+
+def query_flag(name):
+    """Whether a boolean query argument such as ?include_body=1 is set"""
+    return request.args.get(name, '0') not in ('0', 'false', '')
+
+
+def generate_source(source_code, target_format):
+    """Generated code for source_code in target_format; the source must parse"""
+    entry = compile_cache_entry(source_code)
+    slot = f'generated:{target_format}'
+    if slot not in entry:
+        generator = CodeGenerator(target_format)
+        entry[slot] = generator.generate(parse_source(source_code)[0])
+    return entry[slot]
+
+
+def include_body_requested():
+    """Whether the request asked for full policy bodies via ?include_body=1"""
+    return query_flag('include_body')
+
+
+def engine_for_policy(policy_id):
+    """Return the PolicyEngine for a stored policy version, building it on first use"""
+    engine = _engine_cache.get(policy_id)
+    if engine is None:
+        with _engine_lock:
+            engine = _engine_cache.get(policy_id)
+            if engine is None:
+                policy = load_policy_details(policy_id, include_body=True)
+                if policy is None:
+                    raise LookupError(f'Policy with ID {policy_id} not found')
+                engine = _engine_cache[policy_id] = PolicyEngine(policy['compiled_json'])
+    return engine
+
+
 def get_policy_engine():
-    """Get current policy engine instance"""
+    """
+    Get current policy engine instance
+    _current_engine is only ever replaced by a fully built engine in a single
+    assignment, so readers take one reference and need no lock
+    """
     global _current_engine
     
-    if _current_engine is None:
+    engine = _current_engine
+    if engine is None:
         database = get_db()
         if database:
             try:
-                policy_data = database.get_active_policy()
+                policy_data = database.get_active_policy(include_body=False)
                 if policy_data:
-                    compiled_json = json.loads(policy_data['compiled_json'])
-                    _current_engine = PolicyEngine(compiled_json)
+                    engine = _current_engine = engine_for_policy(policy_data['id'])
                     
                     print(f"✓ Loaded active policy: {policy_data['name']} v{policy_data['version']}")
-                    print(f"  - Policies: {len(compiled_json.get('policies', []))}")
-                    for policy in compiled_json.get('policies', []):
+                    print(f"  - Policies: {len(engine.policies)}")
+                    for policy in engine.policies:
                         print(f"    - {policy['type']}: {policy['actions']} on {policy['resource']}")
                         if policy.get('condition'):
                             print(f"      Condition: {policy['condition']}")
                             
             except Exception as e:
                 print(f"Error loading policy engine: {e}")
-                import traceback
                 traceback.print_exc()
     
-    return _current_engine
+    return engine
 
 
-def force_reload_engine():
-    """Force reload of policy engine from database after compilation"""
+def force_reload_engine(policy_id=None):
+    """
+    Force reload of policy engine from database after compilation
+    The previous engine keeps serving requests until the new one is ready.
+    Callers that just saved the active version pass its policy_id, which
+    skips looking the active policy up again.
+    """
     global _current_engine
     
     print("\n🔄 Force reloading policy engine...")
-    _current_engine = None
     
     database = get_db()
     if database:
         try:
-            policy_data = database.get_active_policy()
+            if policy_id is not None:
+                policy_data = {'id': policy_id}
+            else:
+                policy_data = database.get_active_policy(include_body=False)
             if policy_data:
-                compiled_json = json.loads(policy_data['compiled_json'])
-                _current_engine = PolicyEngine(compiled_json)
+                engine = engine_for_policy(policy_data['id'])
+                _current_engine = engine
                 
-                print(f"✓ Reloaded policy: {policy_data['name']} v{policy_data['version']}")
-                print(f"  - Policies count: {len(compiled_json.get('policies', []))}")
-                for i, policy in enumerate(compiled_json.get('policies', [])):
+                if 'name' in policy_data:
+                    print(f"✓ Reloaded policy: {policy_data['name']} v{policy_data['version']}")
+                else:
+                    print(f"✓ Reloaded policy ID {policy_id}")
+                print(f"  - Policies count: {len(engine.policies)}")
+                for i, policy in enumerate(engine.policies):
                     print(f"    Policy {i+1}: {policy['type']} {policy['actions']} on {policy['resource']}")
                     if policy.get('condition'):
                         print(f"      Condition: {policy['condition']}")
                 
                 return True
             else:
+                _current_engine = None
                 print("✗ No active policy found in database")
                 return False
         except Exception as e:
             print(f"✗ Error reloading policy engine: {e}")
-            import traceback
             traceback.print_exc()
             return False
     return False
 
 
-def clear_and_populate_database(ast, source_code, compiled_json):
-    """Clear database and repopulate with data from AST"""
+def clear_and_populate_database(ast, source_code, compiled_json, compiled_text):
+    """
+    Clear database and repopulate with data from AST
+    compiled_text is the generator's JSON output, stored as is;
+    compiled_json is the same document parsed, for the engine
+    """
     global _current_engine
     
     if not DB_AVAILABLE or not db:
@@ -168,421 +660,436 @@ def clear_and_populate_database(ast, source_code, compiled_json):
     
     try:
         extractor = SPLDataExtractor()
-        extractor.visit(ast)
-        
-        # Clear existing data
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM audit_logs')
-            cursor.execute('DELETE FROM compiled_policies')
-            cursor.execute('DELETE FROM users')
-            cursor.execute('DELETE FROM resources')
-            conn.commit()
+        extractor.extract(ast)
+        
+        # Replace users, resources and the policy in one transaction and
+        # publish the new engine with the audit writer paused. Checks answered
+        # by the old policy until then are dropped with its audit rows, the
+        # same as if they had been written before the DELETE.
+        with audit_writer.paused():
+            users_created, resources_created, policy_id = db.replace_policy_data(
+                extractor.users, extractor.resources,
+                policy_name='auto_compiled_policy',
+                source_code=source_code,
+                compiled_json=compiled_text,
+                created_by='system'
+            )
+            
+            # Activate in engine; the old policy rows are gone, so their engines go too.
+            # Registering the new engine under its ID lets the reload below reuse it.
+            _engine_cache.clear()
+            _engine_cache[policy_id] = _current_engine = PolicyEngine(compiled_json)
+            audit_writer.discard_pending()
         
         print(f"✓ Database cleared")
-        
-        # Populate users
-        for user in extractor.users:
-            try:
-                db.create_user(
-                    username=user['username'],
-                    role=user['role'],
-                    email=user['email'],
-                    department=user['department']
-                )
-                print(f"  ✓ Created user: {user['username']} ({user['role']})")
-            except Exception as e:
-                print(f"  ✗ Failed to create user {user['username']}: {e}")
-        
-        # Populate resources
-        for resource in extractor.resources:
-            try:
-                db.create_resource(
-                    name=resource['name'],
-                    type=resource['type'],
-                    path=resource['path'],
-                    description=resource['description'],
-                    owner=resource['owner']
-                )
-                print(f"  ✓ Created resource: {resource['name']}")
-            except Exception as e:
-                print(f"  ✗ Failed to create resource {resource['name']}: {e}")
-        
-        # Save compiled policy
-        policy_id = db.save_compiled_policy(
-            name='auto_compiled_policy',
-            source_code=source_code,
-            compiled_json=json.dumps(compiled_json),
-            created_by='system'
-        )
-        
-        # Activate in engine
-        _current_engine = PolicyEngine(compiled_json)
+        skipped_users = len(extractor.users) - users_created
+        skipped_resources = len(extractor.resources) - resources_created
+        if skipped_users or skipped_resources:
+            print(f"  ✗ Skipped {skipped_users} duplicate user(s) and "
+                  f"{skipped_resources} duplicate resource(s)")
         
         # Force reload to ensure consistency
-        force_reload_engine()
+        force_reload_engine(policy_id)
+        
+        # Read-only endpoints must not serve data from the previous policy.
+        # Cleared only once the new engine is published, so a request racing
+        # the swap cannot re-cache responses built from the old one.
+        invalidate_read_cache()
+        _stored_policy_row.cache_clear()
         
         print(f"✓ Policy saved (ID: {policy_id}) and activated")
-        print(f"✓ Database populated with {len(extractor.users)} users and {len(extractor.resources)} resources")
+        print(f"✓ Database populated with {users_created} users and {resources_created} resources")
         
         return True
         
     except Exception as e:
         print(f"✗ Failed to populate database: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
 
+def rebuild_database(ast, source_code, compiled_json, compiled_text, source_hash, response,
+                     generation):
+    """
+    clear_and_populate_database, then remember response as the result for
+    this source so that resubmitting it skips the rebuild
+    Nothing is remembered if the rebuild fails part way (the database may
+    already hold the new source) or if another rebuild was queued since.
+    """
+    global _last_compile
+    
+    _last_compile = (None, None)
+    if not clear_and_populate_database(ast, source_code, compiled_json, compiled_text):
+        return False
+    with _rebuild_lock:
+        if generation == _rebuild_generation:
+            _last_compile = (source_hash, response)
+    return True
+
+
+def submit_database_rebuild(*args):
+    """Queue rebuild_database(*args) on the database worker; returns (job_id, future)"""
+    global _last_compile, _rebuild_generation
+    
+    job_id = uuid.uuid4().hex
+    with _rebuild_lock:
+        # The database is about to change, so no earlier compile is current
+        _last_compile = (None, None)
+        _rebuild_generation += 1
+        future = db_executor.submit(rebuild_database, *args, _rebuild_generation)
+        _db_jobs[job_id] = future
+        if len(_db_jobs) > DB_JOB_HISTORY:
+            _db_jobs.popitem(last=False)
+    return job_id, future
+
+
+def start_db_executor():
+    """Create the rebuild worker; forked children get a new one as its thread is not inherited"""
+    global db_executor
+    db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='spl-db-rebuild')
+
+
+def require_database():
+    """Reject database-backed routes up front when there is no database"""
+    if request.endpoint in _DB_VIEWS:
+        return jsonify({
+            'error': 'Database not available'
+        }), 500
+
+
+@api.record_once
+def init_database(state):
+    """
+    Open the database when the blueprint is first registered on an app
+    The database is either opened here or not at all, so the gate above is
+    only installed when it is missing and costs nothing otherwise
+    """
+    global db, audit_writer
+    
+    if DB_AVAILABLE:
+        db = DatabaseManager(
+            cache_size_kib=int(os.environ.get('SPL_DB_CACHE_KIB', 4096)),
+            mmap_size=int(os.environ.get('SPL_DB_MMAP_SIZE', 0))
+        )
+        audit_writer = AuditLogWriter(db)
+        start_db_executor()
+        os.register_at_fork(after_in_child=start_db_executor)
+    else:
+        state.app.before_request(require_database)
+
+
+@api.after_request
+def compress_response(response):
+    """
+    Gzip large bodies (token lists, generated code, policy sources) for
+    clients that accept it
+    Streamed and body-less responses pass through untouched
+    """
+    if (response.is_streamed or response.direct_passthrough
+            or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    body = response.get_data()
+    if len(body) < GZIP_MIN_SIZE:
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    if 'gzip' not in request.headers.get('Accept-Encoding', ''):
+        return response
+    
+    response.set_data(gzip.compress(body, compresslevel=5, mtime=0))
+    response.headers['Content-Encoding'] = 'gzip'
+    # The validator now names the compressed bytes, so it is only weakly equal
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
 # ============================================================================
 # COMPILER ROUTES
 # ============================================================================
 
 @api.route('/tokenize', methods=['POST'])
-def tokenize():
+@requires_code
+def tokenize(source_code, data):
     """Tokenize SPL source code"""
-    try:
-        data = request.get_json()
-        
-        if not data or 'code' not in data:
-            return jsonify({
-                "error": "Missing 'code' field in request body"
-            }), 400
-        
-        source_code = data['code']
-        
-        lexer.build()
-        tokens = lexer.tokenize(source_code)
-        
-        token_list = [
-            {
-                "type": token[0],
-                "value": str(token[1]),
-                "line": token[2]
-            }
-            for token in tokens
-        ]
-        
+    # ?compact=1 returns {"types": [...], "values": [...], "lines": [...]}
+    # instead of one object per token
+    if query_flag('compact'):
+        columns = token_columns(source_code)
         return jsonify({
             "success": True,
-            "tokens": token_list,
-            "token_count": len(token_list)
+            "tokens": columns,
+            "token_count": len(columns["types"])
         })
     
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+    token_list = tokenize_source(source_code)
+    
+    return jsonify({
+        "success": True,
+        "tokens": token_list,
+        "token_count": len(token_list)
+    })
 
 
 @api.route('/parse', methods=['POST'])
-def parse():
-    """Parse SPL source code and generate AST"""
-    try:
-        data = request.get_json()
-        
-        if not data or 'code' not in data:
-            return jsonify({
-                "error": "Missing 'code' field in request body"
-            }), 400
-        
-        source_code = data['code']
-        
-        parser.build()
-        ast = parser.parse(source_code)
-        
-        if ast is None:
-            return jsonify({
-                "success": False,
-                "errors": parser.errors,
-                "ast": None
-            }), 400
-        
-        return jsonify({
-            "success": True,
-            "ast": str(ast),
-            "errors": []
-        })
+@requires_code
+def parse(source_code, data):
+    """
+    Parse SPL source code and generate AST
+    ?brief=1 only checks the syntax and leaves "ast" out of the response;
+    ?tree=1 returns the AST as nested objects instead of text
+    """
+    ast, parse_errors = parse_source(source_code)
     
-    except Exception as e:
+    if ast is None:
         return jsonify({
             "success": False,
-            "error": str(e)
-        }), 500
+            "errors": parse_errors,
+            "ast": None
+        }), 400
+    
+    return jsonify({
+        "success": True,
+        "ast": None if query_flag('brief') else ast_output(source_code),
+        "errors": []
+    })
 
 
 @api.route('/compile', methods=['POST'])
-def compile_spl():
+@requires_code
+def compile_spl(source_code, data):
     """Full compilation: Tokenize + Parse + Semantic Analysis + Code Generation"""
-    try:
-        data = request.get_json()
-        
-        if not data or 'code' not in data:
-            return jsonify({
-                "success": False,
-                "error": "Missing 'code' field in request body"
-            }), 400
-        
-        print("=" * 60)
-        print("COMPILING SPL CODE")
-        print("=" * 60)
-        
-        source_code = data['code']
-        should_analyze = data.get('analyze', True)
-        generate_code = data.get('generate_code', False)
-        target_format = data.get('format', 'json')
-        
-        # Step 1: Tokenization
-        lexer.build()
-        tokens = lexer.tokenize(source_code)
-        
-        token_list = [
-            {
-                "type": token[0],
-                "value": str(token[1]),
-                "line": token[2]
-            }
-            for token in tokens
-        ]
-        
-        # Step 2: Parsing
-        parser.build()
-        ast = parser.parse(source_code)
-        
-        if ast is None:
-            frontend_errors = []
-            for error_msg in parser.errors:
-                if "line" in error_msg:
-                    try:
-                        line_part = error_msg.split("line")[1].split(":")[0].strip()
-                        line_number = int(line_part)
-                        message = error_msg.split(": ", 1)[1] if ": " in error_msg else error_msg
-                        
-                        frontend_errors.append({
-                            "line": line_number,
-                            "message": message,
-                            "type": "ERROR"
-                        })
-                    except (IndexError, ValueError):
-                        frontend_errors.append({
-                            "line": 1,
-                            "message": error_msg,
-                            "type": "ERROR"
-                        })
-                else:
-                    frontend_errors.append({
-                        "line": 1,
-                        "message": error_msg,
-                        "type": "ERROR"
-                    })
-            
-            return jsonify({
-                "success": False,
-                "stage": "parsing",
-                "errors": frontend_errors,
-                "tokens": token_list,
-                "stages": {
-                    "tokenization": {
-                        "success": True,
-                        "token_count": len(token_list),
-                        "tokens": token_list
-                    },
-                    "parsing": {
-                        "success": False,
-                        "errors": parser.errors
-                    }
-                }
-            }), 200
+    print("=" * 60)
+    print("COMPILING SPL CODE")
+    print("=" * 60)
+    
+    should_analyze = data.get('analyze', True)
+    generate_code = data.get('generate_code', False)
+    target_format = data.get('format', 'json')
+    # The AST string is only for display; clients that just want the
+    # generated policy skip building and sending it
+    include_ast = data.get('include_ast', False)
+    include_tokens = data.get('include_tokens', False)
+    
+    # Same source as the policy already in the database: regenerating would
+    # wipe and rebuild identical rows, so reuse that result (?force=1 rebuilds)
+    source_hash = source_key(source_code)
+    last_hash, last_response = _last_compile
+    if (generate_code and target_format == 'json' and source_hash == last_hash
+            and _current_engine is not None and not query_flag('force')):
+        print("✓ Source unchanged since last compilation - database left as is\n")
+        stages = dict(last_response["stages"])
+        stages["tokenization"] = tokenization_stage(source_code, include_tokens)
+        stages["parsing"] = dict(stages["parsing"], ast=ast_output(source_code) if include_ast else None)
+        return jsonify(dict(
+            last_response,
+            stages=stages,
+            database_updated=False,
+            cache_hit=True,
+            message="Policy unchanged since last compilation, database left as is"
+        ))
+    
+    # Steps 1 and 2: Tokenization and parsing, in one scan of the source
+    ast, parse_errors = parse_source(source_code)
+    tokenization = tokenization_stage(source_code, include_tokens)
+    
+    if ast is None:
+        frontend_errors = []
+        for error_msg in parse_errors:
+            match = _PARSE_ERROR_RE.search(error_msg)
+            frontend_errors.append({
+                "line": int(match.group(1)) if match else 1,
+                "message": match.group(2) if match else error_msg,
+                "type": "ERROR"
+            })
         
-        response = {
-            "success": True,
+        return jsonify({
+            "success": False,
+            "stage": "parsing",
+            "errors": frontend_errors,
+            "tokens": tokenization["tokens"],
             "stages": {
-                "tokenization": {
-                    "success": True,
-                    "token_count": len(token_list),
-                    "tokens": token_list
-                },
+                "tokenization": tokenization,
                 "parsing": {
-                    "success": True,
-                    "ast": str(ast),
-                    "errors": []
+                    "success": False,
+                    "errors": parse_errors
                 }
             }
+        }), 200
+    
+    response = {
+        "success": True,
+        "stages": {
+            "tokenization": tokenization,
+            "parsing": {
+                "success": True,
+                "ast": ast_output(source_code) if include_ast else None,
+                "errors": []
+            }
         }
+    }
+    
+    # Step 3: Semantic Analysis
+    print("\n--- Running Semantic Analysis ---")
+    semantic_results = analyze_source(source_code)
+    
+    response["stages"]["semantic_analysis"] = {
+        "success": semantic_results["success"],
+        "errors": semantic_results["errors"],
+        "warnings": semantic_results["warnings"],
+        "conflicts": semantic_results["conflicts"],
+        "statistics": semantic_results["statistics"]
+    }
+    
+    if not semantic_results["success"]:
+        print(f"✗ Semantic analysis failed with {len(semantic_results['errors'])} error(s)")
+        for error in semantic_results["errors"]:
+            print(f"  - Line {error['line']}: {error['message']}")
+        
+        frontend_errors = []
+        for error in semantic_results["errors"]:
+            frontend_errors.append({
+                "line": error["line"],
+                "message": error["message"],
+                "type": error["type"]
+            })
         
-        # Step 3: Semantic Analysis
-        print("\n--- Running Semantic Analysis ---")
-        analyzer = SemanticAnalyzer()
-        semantic_results = analyzer.analyze(ast)
+        response["success"] = False
+        response["stage"] = "semantic_analysis"
+        response["errors"] = frontend_errors
+        response["message"] = "Compilation blocked due to semantic errors"
         
-        response["stages"]["semantic_analysis"] = {
-            "success": semantic_results["success"],
-            "errors": semantic_results["errors"],
-            "warnings": semantic_results["warnings"],
-            "conflicts": semantic_results["conflicts"],
-            "statistics": semantic_results["statistics"]
+        print("\n✗ COMPILATION BLOCKED - Fix semantic errors before proceeding\n")
+        return jsonify(response), 200
+    
+    print("✓ Semantic analysis passed")
+    
+    # Step 4: Code Generation
+    compiled_json = None
+    if generate_code:
+        print("\n--- Generating Code ---")
+        generated_code = generate_source(source_code, target_format)
+        
+        response["stages"]["code_generation"] = {
+            "success": generated_code is not None,
+            "target_format": target_format,
+            "generated_code": generated_code,
+            "supported_formats": SUPPORTED_FORMATS
         }
         
-        if not semantic_results["success"]:
-            print(f"✗ Semantic analysis failed with {len(semantic_results['errors'])} error(s)")
-            for error in semantic_results["errors"]:
-                print(f"  - Line {error['line']}: {error['message']}")
-            
-            frontend_errors = []
-            for error in semantic_results["errors"]:
-                frontend_errors.append({
-                    "line": error["line"],
-                    "message": error["message"],
-                    "type": error["type"]
-                })
-            
-            response["success"] = False
-            response["stage"] = "semantic_analysis"
-            response["errors"] = frontend_errors
-            response["message"] = "Compilation blocked due to semantic errors"
-            
-            print("\n✗ COMPILATION BLOCKED - Fix semantic errors before proceeding\n")
-            return jsonify(response), 200
-        
-        print("✓ Semantic analysis passed")
-        
-        # Step 4: Code Generation
-        compiled_json = None
-        if generate_code:
-            print("\n--- Generating Code ---")
-            from compiler.code_generator import CodeGenerator
-            generator = CodeGenerator(target_format)
-            generated_code = generator.generate(ast)
-            
-            response["stages"]["code_generation"] = {
-                "success": generated_code is not None,
-                "target_format": target_format,
-                "generated_code": generated_code,
-                "supported_formats": generator.get_supported_formats()
-            }
-            
-            if target_format == 'json' and generated_code:
-                try:
-                    compiled_json = json.loads(generated_code)
-                    print("✓ Code generation successful")
-                except json.JSONDecodeError:
-                    print("✗ Warning: Generated code is not valid JSON")
-        
-        # Step 5: Database Update
-        if compiled_json and DB_AVAILABLE:
-            print("\n--- Updating Database ---")
-            database_updated = clear_and_populate_database(ast, source_code, compiled_json)
-            response["database_updated"] = database_updated
-            
-            if database_updated:
-                response["message"] = "Policy compiled successfully, database cleared and repopulated"
-                print("\n✓ COMPILATION SUCCESSFUL - Policy active and database updated\n")
-            else:
-                response["message"] = "Policy compiled but could not update database"
-                print("\n⚠ COMPILATION SUCCESSFUL - But database update failed\n")
-        else:
-            response["database_updated"] = False
-            if not DB_AVAILABLE:
-                response["message"] = "Policy compiled successfully (database not available)"
-            elif not compiled_json:
-                response["message"] = "Policy compiled successfully (no JSON output to save)"
+        if target_format == 'json' and generated_code:
+            try:
+                compiled_json = parse_json(generated_code)
+                print("✓ Code generation successful")
+            except json.JSONDecodeError:
+                print("✗ Warning: Generated code is not valid JSON")
+    
+    # Step 5: Database Update
+    if compiled_json and DB_AVAILABLE:
+        print("\n--- Updating Database ---")
+        updated_response = dict(
+            response,
+            database_updated=True,
+            message="Policy compiled successfully, database cleared and repopulated"
+        )
+        job_id, rebuild = submit_database_rebuild(
+            ast, source_code, compiled_json, generated_code, source_hash, updated_response
+        )
         
-        return jsonify(response)
+        # ?async=1 answers without waiting; poll /compile/status/<job_id>
+        if query_flag('async'):
+            response["database_updated"] = "pending"
+            response["job_id"] = job_id
+            response["message"] = "Policy compiled successfully, database update queued"
+            print("\n✓ COMPILATION SUCCESSFUL - Database update queued\n")
+            return jsonify(response), 202
+        
+        if rebuild.result():
+            print("\n✓ COMPILATION SUCCESSFUL - Policy active and database updated\n")
+            return jsonify(updated_response)
+        
+        response["database_updated"] = False
+        response["message"] = "Policy compiled but could not update database"
+        print("\n⚠ COMPILATION SUCCESSFUL - But database update failed\n")
+    else:
+        response["database_updated"] = False
+        if not DB_AVAILABLE:
+            response["message"] = "Policy compiled successfully (database not available)"
+        elif not compiled_json:
+            response["message"] = "Policy compiled successfully (no JSON output to save)"
     
-    except Exception as e:
-        print(f"✗ Compilation error: {e}")
-        import traceback
-        traceback.print_exc()
+    return jsonify(response)
+
+
+@api.route('/compile/status/<job_id>', methods=['GET'])
+def compile_status(job_id):
+    """Outcome of a database update queued by /compile?async=1"""
+    rebuild = _db_jobs.get(job_id)
+    if rebuild is None:
         return jsonify({
             "success": False,
-            "error": str(e)
-        }), 500
+            "error": f"Unknown compile job: {job_id}"
+        }), 404
+    
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "database_updated": rebuild.result() if rebuild.done() else "pending"
+    })
 
 
 @api.route('/validate', methods=['POST'])
-def validate():
+@requires_code
+def validate(source_code, data):
     """Validate SPL code without full compilation"""
-    try:
-        data = request.get_json()
-        
-        if not data or 'code' not in data:
-            return jsonify({
-                "error": "Missing 'code' field in request body"
-            }), 400
-        
-        source_code = data['code']
-        
-        parser.build()
-        ast = parser.parse(source_code)
-        
-        if ast is None:
-            return jsonify({
-                "valid": False,
-                "stage": "parsing",
-                "errors": parser.errors
-            })
-        
-        analyzer = SemanticAnalyzer()
-        semantic_results = analyzer.analyze(ast)
-        
-        if not semantic_results["success"]:
-            return jsonify({
-                "valid": False,
-                "stage": "semantic_analysis",
-                "errors": semantic_results["errors"],
-                "warnings": semantic_results["warnings"],
-                "conflicts": semantic_results["conflicts"]
-            })
-        
+    ast, parse_errors = parse_source(source_code)
+    
+    if ast is None:
         return jsonify({
-            "valid": True,
-            "message": "Code is valid",
-            "errors": [],
-            "warnings": semantic_results["warnings"],
-            "conflicts": semantic_results["conflicts"]
+            "valid": False,
+            "stage": "parsing",
+            "errors": parse_errors
         })
     
-    except Exception as e:
+    semantic_results = analyze_source(source_code)
+    
+    if not semantic_results["success"]:
         return jsonify({
             "valid": False,
-            "error": str(e)
-        }), 500
+            "stage": "semantic_analysis",
+            "errors": semantic_results["errors"],
+            "warnings": semantic_results["warnings"],
+            "conflicts": semantic_results["conflicts"]
+        })
+    
+    return jsonify({
+        "valid": True,
+        "message": "Code is valid",
+        "errors": [],
+        "warnings": semantic_results["warnings"],
+        "conflicts": semantic_results["conflicts"]
+    })
 
 
 @api.route('/analyze', methods=['POST'])
-def analyze_semantics():
+@requires_code
+def analyze_semantics(source_code, data):
     """Perform semantic analysis on SPL code"""
-    try:
-        data = request.get_json()
-        
-        if not data or 'code' not in data:
-            return jsonify({
-                "error": "Missing 'code' field in request body"
-            }), 400
-        
-        source_code = data['code']
-        
-        parser.build()
-        ast = parser.parse(source_code)
-        
-        if ast is None:
-            return jsonify({
-                "success": False,
-                "stage": "parsing",
-                "errors": parser.errors
-            }), 400
-        
-        analyzer = SemanticAnalyzer()
-        results = analyzer.analyze(ast)
-        
-        return jsonify(results)
+    ast, parse_errors = parse_source(source_code)
     
-    except Exception as e:
+    if ast is None:
         return jsonify({
             "success": False,
-            "error": str(e)
-        }), 500
+            "stage": "parsing",
+            "errors": parse_errors
+        }), 400
+    
+    results = analyze_source(source_code)
+    
+    return jsonify(results)
 
 
 # ============================================================================
@@ -592,390 +1099,294 @@ def analyze_semantics():
 @api.route('/execution/check-access', methods=['POST'])
 def check_access():
     """Check if user has access to perform action on resource"""
-    try:
-        data = request.get_json()
-        
-        username = data.get('username')
-        action = data.get('action')
-        resource = data.get('resource')
-        context = data.get('context', {})
-        
-        if not all([username, action, resource]):
-            return jsonify({
-                'error': 'Missing required fields: username, action, resource'
-            }), 400
-        
-        engine = get_policy_engine()
-        if not engine:
-            return jsonify({
-                'error': 'No active policy loaded. Please compile and activate a policy first.'
-            }), 500
-        
-        # Check access with full context (time, request, device)
-        result = engine.check_access(username, action, resource, context)
-        
-        # Log to audit with device and IP information
-        database = get_db()
-        if database:
-            # Extract context info for audit logging
-            request_context = context.get('request', {})
-            device_context = context.get('device', {})
-            
-            ip_address = request_context.get('ip', request.remote_addr)
-            device_type = device_context.get('type')
-            device_os = device_context.get('os')
-            device_browser = device_context.get('browser')
-            device_trusted = device_context.get('trusted')
-            device_location = device_context.get('location')
-            
-            try:
-                database.log_access(
-                    username=username,
-                    action=action,
-                    resource=resource,
-                    allowed=result['allowed'],
-                    reason=result['reason'],
-                    ip_address=ip_address,
-                    device_type=device_type,
-                    device_os=device_os,
-                    device_browser=device_browser,
-                    device_trusted=device_trusted,
-                    device_location=device_location
-                )
-            except Exception as e:
-                print(f"Warning: Failed to log access: {e}")
-        
-        return jsonify(result)
+    username, action, resource, context = read_access_request()
     
-    except Exception as e:
-        print(f"Error in check_access: {e}")
-        import traceback
-        traceback.print_exc()
+    if not all([username, action, resource]):
         return jsonify({
-            'error': str(e)
+            'error': 'Missing required fields: username, action, resource'
+        }), 400
+    
+    engine = get_policy_engine()
+    if not engine:
+        return jsonify({
+            'error': 'No active policy loaded. Please compile and activate a policy first.'
         }), 500
+    
+    # Check access with full context (time, request, device)
+    result = engine.check_access(username, action, resource, context)
+    
+    # Log to audit with device and IP information
+    database = get_db()
+    if database:
+        # Extract context info for audit logging
+        request_context = context.get('request', {})
+        device_context = context.get('device', {})
+        
+        ip_address = request_context.get('ip', request.remote_addr)
+        device_type = device_context.get('type')
+        device_os = device_context.get('os')
+        device_browser = device_context.get('browser')
+        device_trusted = device_context.get('trusted')
+        device_location = device_context.get('location')
+        
+        try:
+            audit_entry = dict(
+                username=username,
+                action=action,
+                resource=resource,
+                allowed=result['allowed'],
+                reason=result['reason'],
+                ip_address=ip_address,
+                device_type=device_type,
+                device_os=device_os,
+                device_browser=device_browser,
+                device_trusted=device_trusted,
+                device_location=device_location
+            )
+            # Fall back to a direct write if the writer's queue is full
+            if not audit_writer.submit(**audit_entry):
+                database.log_access(**audit_entry)
+            invalidate_read_cache('statistics')
+        except Exception as e:
+            print(f"Warning: Failed to log access: {e}")
+    
+    return jsonify(result)
 
 @api.route('/execution/user-permissions/<username>', methods=['GET'])
 def get_user_permissions(username):
     """Get all permissions for a specific user"""
-    try:
-        engine = get_policy_engine()
-        if not engine:
-            return jsonify({
-                'error': 'No active policy loaded'
-            }), 500
-        
-        permissions = engine.get_user_permissions(username)
-        return jsonify(permissions)
-    
-    except Exception as e:
+    engine = get_policy_engine()
+    if not engine:
         return jsonify({
-            'error': str(e)
+            'error': 'No active policy loaded'
         }), 500
+    
+    if username not in engine.users:
+        return jsonify({'error': f"User '{username}' not found"})
+    
+    # Permissions only change with the policy, and the read cache is
+    # cleared whenever a new one is compiled
+    return cached_json_response(
+        f'permissions:{username}', lambda: engine.get_user_permissions(username)
+    )
 
 
 @api.route('/execution/users', methods=['GET'])
+@requires_db
 def get_users():
     """Get all users (READ ONLY)"""
-    try:
-        database = get_db()
-        if not database:
-            return jsonify({
-                'error': 'Database not available'
-            }), 500
-        
+    database = get_db()
+    
+    def build_users():
         users = database.get_all_users()
-        
-        return jsonify({
+        return {
             'success': True,
             'users': users,
             'count': len(users)
-        })
+        }
     
-    except Exception as e:
-        return jsonify({
-            'error': str(e)
-        }), 500
+    return cached_json_response('users', build_users)
 
 
 @api.route('/execution/users/<username>', methods=['GET'])
+@requires_db
 def get_user(username):
     """Get specific user (READ ONLY)"""
-    try:
-        database = get_db()
-        if not database:
-            return jsonify({
-                'error': 'Database not available'
-            }), 500
-        
-        user = database.get_user(username)
-        if not user:
-            return jsonify({
-                'error': f'User "{username}" not found'
-            }), 404
-        
-        return jsonify({
-            'success': True,
-            'user': user
-        })
+    database = get_db()
     
-    except Exception as e:
+    user = None
+    if _IDENTIFIER_RE.match(username):
+        user = cached_payload(
+            f'user:{username}', lambda: database.get_user(username), miss_ttl=LOOKUP_MISS_TTL
+        )
+    if not user:
         return jsonify({
-            'error': str(e)
-        }), 500
+            'error': f'User "{username}" not found'
+        }), 404
+    
+    return conditional_jsonify({
+        'success': True,
+        'user': user
+    })
 
 
 @api.route('/execution/resources', methods=['GET'])
+@requires_db
 def get_resources():
     """Get all resources (READ ONLY)"""
-    try:
-        database = get_db()
-        if not database:
-            return jsonify({
-                'error': 'Database not available'
-            }), 500
-        
+    database = get_db()
+    
+    def build_resources():
         resources = database.get_all_resources()
-        
-        return jsonify({
+        return {
             'success': True,
             'resources': resources,
             'count': len(resources)
-        })
+        }
     
-    except Exception as e:
-        return jsonify({
-            'error': str(e)
-        }), 500
+    return cached_json_response('resources', build_resources)
 
 
 @api.route('/execution/resources/<name>', methods=['GET'])
+@requires_db
 def get_resource(name):
     """Get specific resource (READ ONLY)"""
-    try:
-        database = get_db()
-        if not database:
-            return jsonify({
-                'error': 'Database not available'
-            }), 500
-        
-        resource = database.get_resource(name)
-        if not resource:
-            return jsonify({
-                'error': f'Resource "{name}" not found'
-            }), 404
-        
-        return jsonify({
-            'success': True,
-            'resource': resource
-        })
+    database = get_db()
     
-    except Exception as e:
+    resource = None
+    if _IDENTIFIER_RE.match(name):
+        resource = cached_payload(
+            f'resource:{name}', lambda: database.get_resource(name), miss_ttl=LOOKUP_MISS_TTL
+        )
+    if not resource:
         return jsonify({
-            'error': str(e)
-        }), 500
+            'error': f'Resource "{name}" not found'
+        }), 404
+    
+    return conditional_jsonify({
+        'success': True,
+        'resource': resource
+    })
 
 
 @api.route('/execution/policies', methods=['GET'])
+@requires_db
 def get_policies():
     """Get active policy (READ ONLY)"""
-    try:
-        database = get_db()
-        if not database:
-            return jsonify({
-                'error': 'Database not available'
-            }), 500
-        
-        policy = database.get_active_policy()
-        
-        if policy:
-            return jsonify([{
-                'id': policy['id'],
-                'name': policy['name'],
-                'version': policy['version'],
-                'created_at': policy['created_at'],
-                'active': True,
-                'created_by': policy.get('created_by', 'system')
-            }])
-        else:
-            return jsonify([])
+    database = get_db()
     
-    except Exception as e:
-        return jsonify({
-            'error': str(e)
-        }), 500
+    def build_policy_list():
+        policy = database.get_active_policy(include_body=False)
+        if not policy:
+            return []
+        return [{
+            'id': policy['id'],
+            'name': policy['name'],
+            'version': policy['version'],
+            'created_at': policy['created_at'],
+            'active': True,
+            'created_by': policy.get('created_by', 'system')
+        }]
+    
+    return cached_json_response('policies', build_policy_list)
 
 
 @api.route('/execution/policies/<int:policy_id>', methods=['GET'])
+@requires_db
 def get_policy_details(policy_id):
     """Get policy details (READ ONLY)"""
-    try:
-        database = get_db()
-        if not database:
-            return jsonify({
-                'error': 'Database not available'
-            }), 500
-        
-        with database.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM compiled_policies WHERE id = ?', (policy_id,))
-            policy = cursor.fetchone()
-            
-            if not policy:
-                return jsonify({
-                    'error': f'Policy with ID {policy_id} not found'
-                }), 404
-            
-            policy_dict = dict(policy)
-            try:
-                policy_dict['compiled_json'] = json.loads(policy_dict['compiled_json'])
-            except:
-                pass
-            
-            return jsonify({
-                'success': True,
-                'policy': policy_dict
-            })
-    
-    except Exception as e:
+    policy_dict = load_policy_details(policy_id, include_body_requested())
+    if not policy_dict:
         return jsonify({
-            'error': str(e)
-        }), 500
+            'error': f'Policy with ID {policy_id} not found'
+        }), 404
+    
+    return conditional_jsonify({
+        'success': True,
+        'policy': policy_dict
+    })
 
 
 @api.route('/execution/policies/<name>/history', methods=['GET'])
+@requires_db
 def get_policy_history(name):
     """Get policy version history (READ ONLY)"""
-    try:
-        database = get_db()
-        if not database:
-            return jsonify({
-                'error': 'Database not available'
-            }), 500
-        
-        history = database.get_policy_history(name)
-        
-        return jsonify({
-            'success': True,
-            'policy_name': name,
-            'versions': history,
-            'total_versions': len(history)
-        })
+    database = get_db()
     
-    except Exception as e:
-        return jsonify({
-            'error': str(e)
-        }), 500
+    # SQLite treats a negative LIMIT as no limit at all
+    limit = min(max(request.args.get('limit', 50, type=int), 1), POLICY_HISTORY_MAX_LIMIT)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    history, total_versions = database.get_policy_history(
+        name, limit=limit, offset=offset, include_body=include_body_requested()
+    )
+    
+    return jsonify({
+        'success': True,
+        'policy_name': name,
+        'versions': history,
+        'total_versions': total_versions
+    })
 
 
 @api.route('/execution/policies/source', methods=['GET'])
+@requires_db
 def get_active_policy_source():
     """Get source code for active policy (READ ONLY)"""
-    try:
-        database = get_db()
-        if not database:
-            return jsonify({
-                'error': 'Database not available'
-            }), 500
-        
+    database = get_db()
+    
+    def build_source():
         policy = database.get_active_policy()
-        
         if not policy:
-            return jsonify({
-                'error': 'No active policy found',
-                'success': False
-            }), 404
-        
-        return jsonify({
+            return None
+        return {
             'success': True,
             'source_code': policy['source_code'],
             'policy_name': policy['name'],
             'policy_version': policy['version'],
             'created_at': policy['created_at'],
             'created_by': policy.get('created_by', 'system')
-        })
+        }
     
-    except Exception as e:
+    response = cached_json_response('policy_source', build_source)
+    if response is None:
         return jsonify({
-            'error': str(e),
+            'error': 'No active policy found',
             'success': False
-        }), 500
+        }), 404
+    
+    return response
 
 
 @api.route('/execution/audit-logs', methods=['GET'])
+@requires_db
 def get_audit_logs():
     """Get audit logs"""
-    try:
-        database = get_db()
-        if not database:
-            return jsonify({
-                'error': 'Database not available'
-            }), 500
-        
-        username = request.args.get('username')
-        resource = request.args.get('resource')
-        limit = int(request.args.get('limit', 100))
-        
-        logs = database.get_audit_logs(username, resource, limit)
-        
-        return jsonify({
-            'success': True,
-            'logs': logs,
-            'count': len(logs)
-        })
+    database = get_db()
     
-    except Exception as e:
-        return jsonify({
-            'error': str(e)
-        }), 500
+    username = request.args.get('username')
+    resource = request.args.get('resource')
+    limit = request.args.get('limit', 100, type=int)
+    if limit < 0 or limit > AUDIT_LOG_MAX_LIMIT:
+        limit = AUDIT_LOG_MAX_LIMIT
+    
+    audit_writer.flush()
+    batches = database.iter_audit_log_batches(username, resource, limit)
+    # Read the first batch before the 200 is sent, so a database that is
+    # unavailable up front still gets the normal JSON error response. A
+    # failure in a later batch aborts the stream, and the client sees an
+    # incomplete body rather than a well-formed one.
+    first_batch = next(batches, [])
+    
+    def generate():
+        # Emit one chunk per batch instead of building the full list
+        dumps = current_app.json.dumps
+        count = 0
+        yield b'{"success":true,"logs":['
+        for batch in itertools.chain([first_batch], batches):
+            prefix = b',' if count else b''
+            yield prefix + b','.join(
+                dumps(log, separators=(',', ':')).encode('utf-8') for log in batch
+            )
+            count += len(batch)
+        yield f'],"count":{count}}}'.encode('utf-8')
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 
 @api.route('/execution/statistics', methods=['GET'])
+@requires_db
 def get_statistics():
     """Get access statistics"""
-    try:
-        database = get_db()
-        if not database:
-            return jsonify({
-                'error': 'Database not available'
-            }), 500
-        
-        stats = database.get_access_statistics()
-        users = database.get_all_users()
-        resources = database.get_all_resources()
-        
-        with database.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) as total FROM compiled_policies')
-            total_policies = cursor.fetchone()['total']
-        
-        return jsonify({
+    database = get_db()
+    
+    def build_statistics():
+        audit_writer.flush()
+        return {
             'success': True,
-            'statistics': {
-                'users': {
-                    'total': len(users),
-                    'active': sum(1 for u in users if u.get('active', 1))
-                },
-                'resources': {
-                    'total': len(resources)
-                },
-                'policies': {
-                    'total': total_policies
-                },
-                'access_logs': {
-                    'total_requests': stats.get('total_requests', 0),
-                    'allowed': stats.get('allowed', 0),
-                    'denied': stats.get('denied', 0),
-                    'top_users': stats.get('top_users', []),
-                    'top_resources': stats.get('top_resources', [])
-                }
-            }
-        })
+            'statistics': database.get_dashboard_statistics()
+        }
     
-    except Exception as e:
-        return jsonify({
-            'error': str(e)
-        }), 500
+    return cached_json_response('statistics', build_statistics)
 
 
 # ============================================================================
@@ -985,28 +1396,28 @@ def get_statistics():
 @api.route('/health', methods=['GET'])
 def health_check():
     """API health check"""
-    database = get_db()
-    engine = get_policy_engine()
+    def build_health():
+        return {
+            "status": "healthy",
+            "compiler": "ready",
+            "database": "available" if get_db() else "unavailable",
+            "policy_engine": "active" if get_policy_engine() else "inactive"
+        }
     
-    return jsonify({
-        "status": "healthy",
-        "compiler": "ready",
-        "database": "available" if database else "unavailable",
-        "policy_engine": "active" if engine else "inactive"
-    })
+    return cached_json_response('health', build_health, ttl=HEALTH_CACHE_TTL)
 
 
 @api.route('/execution/health', methods=['GET'])
 def execution_health_check():
     """Execution engine health check"""
-    database = get_db()
-    engine = get_policy_engine()
+    def build_health():
+        return {
+            'status': 'healthy',
+            'database': 'available' if get_db() else 'unavailable',
+            'policy_engine': 'active' if get_policy_engine() else 'inactive'
+        }
     
-    return jsonify({
-        'status': 'healthy',
-        'database': 'available' if database else 'unavailable',
-        'policy_engine': 'active' if engine else 'inactive'
-    })
+    return cached_json_response('execution_health', build_health, ttl=HEALTH_CACHE_TTL)
 
 
 # ============================================================================
@@ -1022,6 +1433,16 @@ def api_not_found(error):
     }), 404
 
 
+@api.errorhandler(413)
+def api_request_too_large(error):
+    """Handle request bodies over MAX_CONTENT_LENGTH"""
+    return jsonify({
+        "success": False,
+        "error": "Request body too large",
+        "max_bytes": current_app.config.get('MAX_CONTENT_LENGTH')
+    }), 413
+
+
 @api.errorhandler(500)
 def api_internal_error(error):
     """Handle 500 errors"""
@@ -1029,3 +1450,18 @@ def api_internal_error(error):
         "error": "Internal server error in API",
         "message": str(error)
     }), 500
+
+
+@api.errorhandler(Exception)
+def api_unhandled_exception(error):
+    """Turn any uncaught exception in a route into a JSON error response"""
+    if isinstance(error, HTTPException):
+        return error
+    
+    # Through the app logger rather than print_exc, so deployments can
+    # lower its level and skip formatting the traceback
+    current_app.logger.exception("Unhandled error in %s", request.endpoint)
+    return jsonify({
+        _ERROR_FLAGS.get(request.endpoint, "success"): False,
+        "error": str(error)
+    }), 500
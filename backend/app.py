@@ -4,17 +4,84 @@ Flask Application - SPL Compiler & Execution Engine
 SOURCE CODE AS SINGLE SOURCE OF TRUTH
 """
 
+import os
+
+# `python app.py` runs Flask's debug server unless SPL_GEVENT=1 asks for
+# gevent, which must patch the stdlib before anything else imports
+# sockets/threads. Greenlets overlap on client socket I/O only: sqlite3 is
+# a C extension gevent cannot patch, so each query blocks the hub.
+GEVENT_AVAILABLE = False
+if os.environ.get('SPL_GEVENT', '').lower() in ('1', 'true', 'yes'):
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+        GEVENT_AVAILABLE = True
+    except ImportError:
+        print("✗ SPL_GEVENT is set but gevent is not installed - using the Flask server")
+
 from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-import os
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Import single unified API blueprint
 from api.routes import api
 
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    jsonify / request.get_json backed by orjson
+    Keeps Flask's key sorting and date handling; anything orjson cannot
+    encode falls back to the stdlib encoder
+    """
+    
+    def _option(self, kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return option
+    
+    def dumps(self, obj, **kwargs):
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._option(kwargs)).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+    
+    def response(self, *args, **kwargs):
+        """
+        jsonify body straight from orjson's bytes, without the decode and
+        re-encode the default provider does around dumps()
+        """
+        obj = self._prepare_response_obj(args, kwargs)
+        dump_args = {}
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args['indent'] = 2
+        try:
+            body = orjson.dumps(
+                obj, default=self.default,
+                option=self._option(dump_args) | orjson.OPT_APPEND_NEWLINE
+            )
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 def create_app():
     """Application factory"""
     app = Flask(__name__)
     
+    if ORJSON_AVAILABLE:
+        app.json = ORJSONProvider(app)
+    
     # Enable CORS for all routes
     CORS(app, resources={
         r"/api/*": {
@@ -27,6 +94,9 @@ def create_app():
     # Configuration
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
     app.config['JSON_SORT_KEYS'] = False
+    # Request bodies are SPL sources or small JSON objects; anything larger
+    # is refused with 413 before it is read or decoded
+    app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('SPL_MAX_BODY', 1 << 20))
     
     # Register single unified blueprint
     app.register_blueprint(api)
@@ -103,8 +173,15 @@ if __name__ == '__main__':
     print("✓ Execution endpoints: /api/execution/*")
     print("\nPress CTRL+C to stop\n")
     
-    app.run(
-        host='0.0.0.0',
-        port=5000,
-        debug=True
-    )
\ No newline at end of file
+    if GEVENT_AVAILABLE:
+        # Cooperative server: greenlets yield to each other while waiting on
+        # clients, not during SQLite queries (see the note at the top)
+        from gevent.pywsgi import WSGIServer
+        print("✓ Serving with gevent WSGIServer")
+        WSGIServer(('0.0.0.0', 5000), app).serve_forever()
+    else:
+        app.run(
+            host='0.0.0.0',
+            port=5000,
+            debug=True
+        )
\ No newline at end of file
@@ -243,4 +243,72 @@ class ASTPrinter(ASTVisitor):
         self.indent_level -= 1
     
     def visit_AttributeNode(self, node):
-        print(f"{self.indent()}{node.object_name}.{node.attribute_name}")
\ No newline at end of file
+        print(f"{self.indent()}{node.object_name}.{node.attribute_name}")
+
+# AST serializer for structured (JSON) output
+class ASTSerializer(ASTVisitor):
+    """
+    Convert the AST to plain dicts and lists, one dict per node
+    Clients get the tree structure directly instead of parsing str(ast)
+    """
+    
+    def visit_ProgramNode(self, node):
+        return {
+            "type": "Program",
+            "statements": [self.visit(statement) for statement in node.statements]
+        }
+    
+    def _definition(self, kind, node):
+        return {
+            "type": kind,
+            "name": node.name,
+            "properties": node.properties,
+            "line": node.line_number
+        }
+    
+    def visit_RoleNode(self, node):
+        return self._definition("Role", node)
+    
+    def visit_UserNode(self, node):
+        return self._definition("User", node)
+    
+    def visit_ResourceNode(self, node):
+        return self._definition("Resource", node)
+    
+    def visit_PolicyNode(self, node):
+        return {
+            "type": "Policy",
+            "policy_type": node.policy_type,
+            "actions": node.actions,
+            "resource": node.resource,
+            "condition": self.visit(node.condition) if node.condition else None,
+            "line": node.line_number
+        }
+    
+    def visit_BinaryOpNode(self, node):
+        return {
+            "type": "BinaryOp",
+            "operator": node.operator,
+            "left": self.visit(node.left),
+            "right": self.visit(node.right)
+        }
+    
+    def visit_UnaryOpNode(self, node):
+        return {
+            "type": "UnaryOp",
+            "operator": node.operator,
+            "operand": self.visit(node.operand)
+        }
+    
+    def visit_AttributeNode(self, node):
+        return {
+            "type": "Attribute",
+            "object": node.object_name,
+            "attribute": node.attribute_name
+        }
+    
+    def visit_LiteralNode(self, node):
+        return {
+            "type": "Literal",
+            "value": node.value
+        }
@@ -3,6 +3,9 @@ backend/compiler/code_generator.py
 Auto-generates policies from role definitions
 """
 
+import json
+import re
+
 from compiler.parser import (
     ASTVisitor, BinaryOpNode, AttributeNode, LiteralNode, UnaryOpNode,
     ProgramNode, RoleNode, UserNode, ResourceNode, PolicyNode
@@ -148,8 +151,6 @@ class CodeGenerator(ASTVisitor):
     
     def _generate_json(self):
         """Generate JSON output with proper structure for execution engine"""
-        import json
-        
         output = {
             "roles": self.roles,
             "users": self.users,
@@ -282,8 +283,6 @@ engine = PolicyEngine()
         
         # Replace attribute access
         # user.role -> context.get('user', {}).get('role')
-        import re
-        
         def replace_attribute(match):
             obj = match.group(1)
             attr = match.group(2)
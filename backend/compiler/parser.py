@@ -15,6 +15,32 @@ from compiler.lexer import SPLLexer
 from compiler.ast_nodes import *
 
 
+class TokenRecorder:
+    """
+    Lexer stand-in that hands yacc each token while keeping the same
+    (token_type, token_value, line_number) tuples SPLLexer.tokenize() returns,
+    so a caller that needs both gets them from a single scan
+    """
+    
+    def __init__(self):
+        self.lexer = None
+        self.tokens = []
+        # True once the lexer reported end of input; a parse that stopped
+        # early leaves the token list incomplete
+        self.complete = False
+    
+    def input(self, data):
+        self.lexer.input(data)
+    
+    def token(self):
+        tok = self.lexer.token()
+        if tok is None:
+            self.complete = True
+        else:
+            self.tokens.append((tok.type, tok.value, tok.lineno))
+        return tok
+
+
 class SPLParser:
     """Parser for Secure Policy Language using PLY"""
     
@@ -255,13 +281,14 @@ class SPLParser:
         )
         return self.parser
     
-    def parse(self, data, debug=False):
+    def parse(self, data, debug=False, recorder=None):
         """
         Parse input data and return AST
         
         Args:
             data (str): Source code to parse
             debug (bool): Enable debug output
+            recorder (TokenRecorder): Optionally collects the tokens read
             
         Returns:
             AST root node or None if errors occurred
@@ -275,7 +302,12 @@ class SPLParser:
         # Clear previous errors
         self.errors = []
         
-        result = self.parser.parse(data, lexer=self.lexer.lexer, debug=debug)
+        lexer = self.lexer.lexer
+        if recorder is not None:
+            recorder.lexer = lexer
+            lexer = recorder
+        
+        result = self.parser.parse(data, lexer=lexer, debug=debug)
         
         if self.errors:
             print(f"\nParsing completed with {len(self.errors)} error(s)")
@@ -79,6 +79,14 @@ class SemanticAnalyzer(ASTVisitor):
     VALID_ACTIONS = {'read', 'write', 'delete', 'execute', 'create', 'update', 'list', '*'}
     
     def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        """
+        Start a fresh analysis on this instance
+        State is rebound rather than cleared, so results returned by earlier
+        analyze() calls keep their own lists
+        """
         self.symbol_table = SymbolTable()
         self.errors = []
         self.warnings = []
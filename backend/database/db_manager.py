@@ -3,10 +3,14 @@ backend/database/db_manager.py
 SQLite Database Manager for User/Resource Management
 """
 
+import atexit
 import sqlite3
 import json
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import os
 from contextlib import contextmanager
 
@@ -14,27 +18,101 @@ from contextlib import contextmanager
 class DatabaseManager:
     """Manages SQLite database for users, resources, and audit logs"""
     
-    def __init__(self, db_path: str = "spl_database.db"):
-        """Initialize database connection"""
+    # Columns that update_user / update_resource are allowed to modify
+    USER_UPDATE_FIELDS = frozenset({'role', 'email', 'department', 'active'})
+    RESOURCE_UPDATE_FIELDS = frozenset({'type', 'path', 'description', 'owner'})
+    
+    # Policy listings and lookups leave out the large source/compiled blobs unless asked for
+    POLICY_SUMMARY_COLUMNS = 'id, name, version, active, created_at, created_by'
+    
+    def __init__(self, db_path: str = "spl_database.db", pool_size: int = 10,
+                 max_overflow: int = 20, pool_timeout: float = 5.0,
+                 cache_size_kib: int = 4096, mmap_size: int = 0):
+        """
+        Initialize database connection pool
+        At most pool_size + max_overflow connections are open at once; callers
+        beyond that wait up to pool_timeout seconds for one to be returned.
+        cache_size_kib and mmap_size apply to every connection, so the worst
+        case is (pool_size + max_overflow) times each.
+        """
         self.db_path = db_path
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self._reset_pool()
+        # SQLite connections must not be used across fork(); a forked worker
+        # starts with an empty pool of its own
+        os.register_at_fork(after_in_child=self._reset_pool)
+        self.enable_wal()
         self.create_tables()
     
+    def _reset_pool(self):
+        """Start a fresh, empty pool; connections in any previous pool are not reused"""
+        # Inherited connections are deliberately left unclosed so the parent's are untouched
+        self._inherited_pool = getattr(self, '_pool', None)
+        self._pool = queue.LifoQueue(maxsize=self.pool_size)
+        self._checkouts = threading.BoundedSemaphore(self.pool_size + self.max_overflow)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection that may be handed between threads"""
+        conn = sqlite3.connect(self.db_path, timeout=10.0, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # Under WAL, NORMAL only fsyncs at checkpoints instead of every commit
+        conn.execute('PRAGMA synchronous = NORMAL')
+        # Keep sort/temp tables in RAM. The page cache (4 MiB by default)
+        # comfortably holds this database; memory mapping is off unless asked for
+        conn.execute('PRAGMA temp_store = MEMORY')
+        conn.execute(f'PRAGMA cache_size = -{int(self.cache_size_kib)}')
+        conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+        return conn
+    
+    def enable_wal(self):
+        """
+        Switch the database file to write-ahead logging so readers do not
+        block on writers. The journal mode is stored in the file itself.
+        """
+        with self.get_connection() as conn:
+            conn.execute('PRAGMA journal_mode = WAL')
+    
     @contextmanager
     def get_connection(self):
         """
         Context manager for database connections
-        Creates a fresh connection for each operation
+        Leases a pooled connection and returns it to the pool afterwards;
+        opens an overflow connection when the pool is empty
         """
-        conn = sqlite3.connect(self.db_path, timeout=10.0)
-        conn.row_factory = sqlite3.Row
+        if not self._checkouts.acquire(timeout=self.pool_timeout):
+            raise sqlite3.OperationalError(
+                f"Connection pool exhausted: no connection free within {self.pool_timeout}s"
+            )
         try:
-            yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                try:
+                    self._pool.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
         finally:
-            conn.close()
+            self._checkouts.release()
+    
+    def close_all(self):
+        """Close every idle pooled connection"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
     
     def create_tables(self):
         """Create all necessary tables"""
@@ -88,6 +166,21 @@ class DatabaseManager:
                 )
             ''')
             
+            # Audit log filters (username / resource) are always newest-first with a LIMIT;
+            # these let SQLite walk an index in order instead of scanning and sorting
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp
+                ON audit_logs (timestamp DESC)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_audit_logs_username_timestamp
+                ON audit_logs (username, timestamp DESC)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_audit_logs_resource_timestamp
+                ON audit_logs (resource, timestamp DESC)
+            ''')
+            
             # Compiled policies table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS compiled_policies (
@@ -102,19 +195,34 @@ class DatabaseManager:
                     FOREIGN KEY (created_by) REFERENCES users(username)
                 )
             ''')
+            
+            # get_active_policy reads the newest active row with LIMIT 1; the partial
+            # index holds only active rows, already in created_at order
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_compiled_policies_active_created
+                ON compiled_policies (created_at DESC) WHERE active = 1
+            ''')
+            # Per-name lookups: next version on save, history pages, named active policy
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_compiled_policies_name_version
+                ON compiled_policies (name, version DESC)
+            ''')
     
     # ============ USER OPERATIONS ============
     
     def create_user(self, username: str, role: str, email: str = None, 
-                   department: str = None) -> int:
-        """Create a new user"""
+                   department: str = None) -> Optional[int]:
+        """Create a new user, returning None if the username is already taken"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO users (username, role, email, department)
                 VALUES (?, ?, ?, ?)
+                ON CONFLICT(username) DO NOTHING
+                RETURNING id
             ''', (username, role, email, department))
-            return cursor.lastrowid
+            row = cursor.fetchone()
+            return row[0] if row else None
     
     def get_user(self, username: str) -> Optional[Dict[str, Any]]:
         """Get user by username"""
@@ -133,12 +241,11 @@ class DatabaseManager:
     
     def update_user(self, username: str, **kwargs) -> bool:
         """Update user information"""
-        valid_fields = ['role', 'email', 'department', 'active']
         updates = []
         values = []
         
         for field, value in kwargs.items():
-            if field in valid_fields:
+            if field in self.USER_UPDATE_FIELDS:
                 updates.append(f"{field} = ?")
                 values.append(value)
         
@@ -160,15 +267,18 @@ class DatabaseManager:
     # ============ RESOURCE OPERATIONS ============
     
     def create_resource(self, name: str, type: str, path: str, 
-                       description: str = None, owner: str = None) -> int:
-        """Create a new resource"""
+                       description: str = None, owner: str = None) -> Optional[int]:
+        """Create a new resource, returning None if the name is already taken"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO resources (name, type, path, description, owner)
                 VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO NOTHING
+                RETURNING id
             ''', (name, type, path, description, owner))
-            return cursor.lastrowid
+            row = cursor.fetchone()
+            return row[0] if row else None
     
     def get_resource(self, name: str) -> Optional[Dict[str, Any]]:
         """Get resource by name"""
@@ -187,12 +297,11 @@ class DatabaseManager:
     
     def update_resource(self, name: str, **kwargs) -> bool:
         """Update resource information"""
-        valid_fields = ['type', 'path', 'description', 'owner']
         updates = []
         values = []
         
         for field, value in kwargs.items():
-            if field in valid_fields:
+            if field in self.RESOURCE_UPDATE_FIELDS:
                 updates.append(f"{field} = ?")
                 values.append(value)
         
@@ -251,122 +360,188 @@ class DatabaseManager:
                   device_type, device_os, device_browser, device_trusted, device_location))
             return cursor.lastrowid
     
+    def log_access_batch(self, entries: List[tuple]) -> int:
+        """
+        Insert many audit log rows in one transaction
+        Each entry is (timestamp, username, action, resource, allowed, reason,
+        ip_address, device_type, device_os, device_browser, device_trusted,
+        device_location)
+        """
+        with self.get_connection() as conn:
+            conn.executemany('''
+                INSERT INTO audit_logs 
+                (timestamp, username, action, resource, allowed, reason, ip_address,
+                 device_type, device_os, device_browser, device_trusted, device_location)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', entries)
+        return len(entries)
+    
     def get_audit_logs(self, username: str = None, resource: str = None, 
                       limit: int = 100) -> List[Dict[str, Any]]:
         """Get audit logs with optional filtering"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            query = 'SELECT * FROM audit_logs WHERE 1=1'
-            params = []
-            
-            if username:
-                query += ' AND username = ?'
-                params.append(username)
-            
-            if resource:
-                query += ' AND resource = ?'
-                params.append(resource)
+        return [log for batch in self.iter_audit_log_batches(username, resource, limit)
+                for log in batch]
+    
+    def iter_audit_log_batches(self, username: str = None, resource: str = None,
+                               limit: int = 100,
+                               batch_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield audit logs, newest first, in lists of up to batch_size rows
+        Each batch is read on its own pooled connection, which is returned
+        before the batch is yielded, so a slow consumer holds no connection.
+        Batches continue after the last (timestamp, id) of the previous one.
+        """
+        query = 'SELECT * FROM audit_logs WHERE 1=1'
+        params = []
+        
+        if username:
+            query += ' AND username = ?'
+            params.append(username)
+        
+        if resource:
+            query += ' AND resource = ?'
+            params.append(resource)
+        
+        # A negative limit means no limit, as with SQLite's LIMIT
+        remaining = limit if limit >= 0 else float('inf')
+        last_key = None
+        while remaining > 0:
+            batch_query = query
+            batch_params = list(params)
+            if last_key:
+                batch_query += ' AND (timestamp, id) < (?, ?)'
+                batch_params.extend(last_key)
+            batch_query += ' ORDER BY timestamp DESC, id DESC LIMIT ?'
+            size = min(batch_size, remaining)
+            batch_params.append(size)
             
-            query += ' ORDER BY timestamp DESC LIMIT ?'
-            params.append(limit)
+            with self.get_connection() as conn:
+                rows = [dict(row) for row in conn.execute(batch_query, batch_params).fetchall()]
+            if not rows:
+                break
             
-            cursor.execute(query, params)
-            return [dict(row) for row in cursor.fetchall()]
+            yield rows
+            if len(rows) < size:
+                break
+            remaining -= len(rows)
+            last_key = (rows[-1]['timestamp'], rows[-1]['id'])
     
     def get_access_statistics(self) -> Dict[str, Any]:
         """Get access statistics"""
+        with self.get_connection() as conn:
+            return self._access_statistics(conn.cursor())
+    
+    def get_dashboard_statistics(self) -> Dict[str, Any]:
+        """
+        Get entity counts and access statistics using a single connection
+        All entity counts come back from one statement of scalar subqueries
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            # Total requests
-            cursor.execute('SELECT COUNT(*) as total FROM audit_logs')
-            total = cursor.fetchone()['total']
-            
-            # Allowed vs Denied
-            cursor.execute('''
-                SELECT 
-                    SUM(CASE WHEN allowed = 1 THEN 1 ELSE 0 END) as allowed,
-                    SUM(CASE WHEN allowed = 0 THEN 1 ELSE 0 END) as denied
-                FROM audit_logs
-            ''')
-            access_counts = dict(cursor.fetchone())
-            
-            # Top users
-            cursor.execute('''
-                SELECT username, COUNT(*) as count
-                FROM audit_logs
-                GROUP BY username
-                ORDER BY count DESC
-                LIMIT 5
-            ''')
-            top_users = [dict(row) for row in cursor.fetchall()]
-            
-            # Top resources
             cursor.execute('''
-                SELECT resource, COUNT(*) as count
-                FROM audit_logs
-                GROUP BY resource
-                ORDER BY count DESC
-                LIMIT 5
+                SELECT
+                    (SELECT COUNT(*) FROM users WHERE active = 1) as users_active,
+                    (SELECT COUNT(*) FROM resources) as resources_total,
+                    (SELECT COUNT(*) FROM compiled_policies) as policies_total
             ''')
-            top_resources = [dict(row) for row in cursor.fetchall()]
+            counts = cursor.fetchone()
             
             return {
-                'total_requests': total,
-                'allowed': access_counts['allowed'] or 0,
-                'denied': access_counts['denied'] or 0,
-                'top_users': top_users,
-                'top_resources': top_resources
+                # Deactivated users are not counted at all, matching get_all_users,
+                # so total and active are the same number
+                'users': {'total': counts['users_active'], 'active': counts['users_active']},
+                'resources': {'total': counts['resources_total']},
+                'policies': {'total': counts['policies_total']},
+                'access_logs': self._access_statistics(cursor)
             }
     
+    def _access_statistics(self, cursor: sqlite3.Cursor) -> Dict[str, Any]:
+        """Run the audit log aggregate queries on an open cursor"""
+        # Total requests and allowed vs denied in one pass
+        cursor.execute('''
+            SELECT 
+                COUNT(*) as total,
+                SUM(CASE WHEN allowed = 1 THEN 1 ELSE 0 END) as allowed,
+                SUM(CASE WHEN allowed = 0 THEN 1 ELSE 0 END) as denied
+            FROM audit_logs
+        ''')
+        access_counts = cursor.fetchone()
+        
+        # Top users
+        cursor.execute('''
+            SELECT username, COUNT(*) as count
+            FROM audit_logs
+            GROUP BY username
+            ORDER BY count DESC
+            LIMIT 5
+        ''')
+        top_users = [dict(row) for row in cursor.fetchall()]
+        
+        # Top resources
+        cursor.execute('''
+            SELECT resource, COUNT(*) as count
+            FROM audit_logs
+            GROUP BY resource
+            ORDER BY count DESC
+            LIMIT 5
+        ''')
+        top_resources = [dict(row) for row in cursor.fetchall()]
+        
+        return {
+            'total_requests': access_counts['total'],
+            'allowed': access_counts['allowed'] or 0,
+            'denied': access_counts['denied'] or 0,
+            'top_users': top_users,
+            'top_resources': top_resources
+        }
+    
     # ============ POLICY OPERATIONS ============
     
     def save_compiled_policy(self, name: str, source_code: str, 
                             compiled_json: str, created_by: str = None) -> int:
         """Save a compiled policy"""
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Deactivate previous versions
-            cursor.execute('''
-                UPDATE compiled_policies 
-                SET active = 0 
-                WHERE name = ?
-            ''', (name,))
-            
-            # Get next version number
-            cursor.execute('''
-                SELECT COALESCE(MAX(version), 0) + 1 as next_version
-                FROM compiled_policies
-                WHERE name = ?
-            ''', (name,))
-            next_version = cursor.fetchone()['next_version']
-            
-            # Insert new version
-            cursor.execute('''
-                INSERT INTO compiled_policies 
-                (name, source_code, compiled_json, version, created_by)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (name, source_code, compiled_json, next_version, created_by))
-            
-            return cursor.lastrowid
+            return self._insert_policy_version(conn.cursor(), name, source_code,
+                                               compiled_json, created_by)
+    
+    @staticmethod
+    def _insert_policy_version(cursor, name: str, source_code: str,
+                               compiled_json: str, created_by: str = None) -> int:
+        """Deactivate earlier versions of name and insert the next one, on the caller's transaction"""
+        cursor.execute('''
+            UPDATE compiled_policies 
+            SET active = 0 
+            WHERE name = ?
+        ''', (name,))
+        
+        # Insert new version, computing the next version number in the same statement
+        cursor.execute('''
+            INSERT INTO compiled_policies 
+            (name, source_code, compiled_json, version, created_by)
+            SELECT ?, ?, ?, COALESCE(MAX(version), 0) + 1, ?
+            FROM compiled_policies
+            WHERE name = ?
+        ''', (name, source_code, compiled_json, created_by, name))
+        
+        return cursor.lastrowid
     
-    def get_active_policy(self, name: str = None) -> Optional[Dict[str, Any]]:
-        """Get active policy"""
+    def get_active_policy(self, name: str = None, include_body: bool = True) -> Optional[Dict[str, Any]]:
+        """Get active policy, optionally without its source/compiled blobs"""
+        columns = '*' if include_body else self.POLICY_SUMMARY_COLUMNS
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
             if name:
-                cursor.execute('''
-                    SELECT * FROM compiled_policies 
+                cursor.execute(f'''
+                    SELECT {columns} FROM compiled_policies 
                     WHERE name = ? AND active = 1
                     ORDER BY version DESC
                     LIMIT 1
                 ''', (name,))
             else:
-                cursor.execute('''
-                    SELECT * FROM compiled_policies 
+                cursor.execute(f'''
+                    SELECT {columns} FROM compiled_policies 
                     WHERE active = 1
                     ORDER BY created_at DESC
                     LIMIT 1
@@ -375,16 +550,75 @@ class DatabaseManager:
             row = cursor.fetchone()
             return dict(row) if row else None
     
-    def get_policy_history(self, name: str) -> List[Dict[str, Any]]:
-        """Get version history of a policy"""
+    def get_policy_history(self, name: str, limit: int = 50, offset: int = 0,
+                           include_body: bool = False) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Get one page of a policy's version history, newest first
+        Returns (versions, total_versions); the total comes from the same
+        query via a window count instead of fetching every version
+        """
+        columns = '*' if include_body else self.POLICY_SUMMARY_COLUMNS
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM compiled_policies
+            cursor.execute(f'''
+                SELECT {columns}, COUNT(*) OVER () AS total_versions
+                FROM compiled_policies
                 WHERE name = ?
                 ORDER BY version DESC
-            ''', (name,))
-            return [dict(row) for row in cursor.fetchall()]
+                LIMIT ? OFFSET ?
+            ''', (name, limit, offset))
+            versions = [dict(row) for row in cursor.fetchall()]
+            
+            if versions:
+                total = versions[0]['total_versions']
+                for version in versions:
+                    del version['total_versions']
+            elif offset:
+                # Page past the end: the window count has no row to ride on
+                cursor.execute('SELECT COUNT(*) FROM compiled_policies WHERE name = ?', (name,))
+                total = cursor.fetchone()[0]
+            else:
+                total = 0
+            return versions, total
+    
+    def replace_policy_data(self, users: List[Dict[str, Any]],
+                            resources: List[Dict[str, Any]], policy_name: str,
+                            source_code: str, compiled_json: str,
+                            created_by: str = None) -> Tuple[int, int, int]:
+        """
+        Clear audit logs, policies, users and resources, then insert the given
+        users, resources and compiled policy, all in one transaction
+        Names already inserted are skipped; returns
+        (users_created, resources_created, policy_id)
+        """
+        with self.get_connection() as conn:
+            # Take the write lock up front: the rebuild is one commit, and a
+            # concurrent writer waits here instead of failing mid-way
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM audit_logs')
+            conn.execute('DELETE FROM compiled_policies')
+            conn.execute('DELETE FROM users')
+            conn.execute('DELETE FROM resources')
+            
+            users_created = conn.executemany('''
+                INSERT INTO users (username, role, email, department)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(username) DO NOTHING
+            ''', [(user['username'], user['role'], user.get('email'), user.get('department'))
+                  for user in users]).rowcount
+            
+            resources_created = conn.executemany('''
+                INSERT INTO resources (name, type, path, description, owner)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO NOTHING
+            ''', [(resource['name'], resource['type'], resource['path'],
+                   resource.get('description'), resource.get('owner'))
+                  for resource in resources]).rowcount
+            
+            policy_id = self._insert_policy_version(conn.cursor(), policy_name, source_code,
+                                                    compiled_json, created_by)
+        
+        return users_created, resources_created, policy_id
     
     # ============ INITIALIZATION ============
     
@@ -397,12 +631,9 @@ class DatabaseManager:
             ('Charlie', 'Guest', 'charlie@utech.edu.jm', 'Sales')
         ]
         
+        # Existing users are left untouched by create_user
         for username, role, email, dept in users_to_create:
-            try:
-                self.create_user(username, role, email, dept)
-            except sqlite3.IntegrityError:
-                # User already exists, skip
-                pass
+            self.create_user(username, role, email, dept)
         
         # Create sample resources
         resources_to_create = [
@@ -411,9 +642,120 @@ class DatabaseManager:
             ('API_Users', 'api', '/api/users', 'User management API', 'Bob')
         ]
         
+        # Existing resources are left untouched by create_resource
         for name, rtype, path, desc, owner in resources_to_create:
+            self.create_resource(name, rtype, path, desc, owner)
+
+class AuditLogWriter:
+    """
+    Writes audit log entries from a background thread in batches, so that
+    access checks only enqueue a row instead of waiting on a commit
+    """
+    
+    def __init__(self, db_manager: DatabaseManager, batch_size: int = 1000,
+                 flush_interval: float = 0.1, max_pending: int = 10000):
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._start()
+        # Threads do not survive fork(); a forked worker gets its own queue and writer
+        os.register_at_fork(after_in_child=self._start)
+        # The writer is a daemon thread, so write what is still queued at exit
+        atexit.register(self.flush)
+    
+    def _start(self):
+        """Create the entry queue and launch the writer thread"""
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        # Held while a batch is written; see paused()
+        self._write_lock = threading.RLock()
+        # Entries are tagged with the epoch they were queued in;
+        # discard_pending() moves to a new epoch and older entries are dropped
+        self._epoch = 0
+        self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+        self._thread.start()
+    
+    def submit(self, username: str, action: str, resource: str, allowed: bool,
+               reason: str, ip_address: str = None, device_type: str = None,
+               device_os: str = None, device_browser: str = None,
+               device_trusted: bool = None, device_location: str = None) -> bool:
+        """
+        Queue an access attempt for logging (same fields as log_access)
+        The timestamp is taken now rather than when the batch is written.
+        Returns False if the queue is full and the entry was not accepted.
+        """
+        timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            self._queue.put_nowait((self._epoch, (timestamp, username, action, resource, allowed,
+                                                  reason, ip_address, device_type, device_os,
+                                                  device_browser, device_trusted, device_location)))
+            return True
+        except queue.Full:
+            return False
+    
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until every entry queued before this call has been written
+        Entries submitted meanwhile do not extend the wait. Returns False if
+        that did not happen within timeout seconds.
+        """
+        deadline = time.monotonic() + timeout
+        written = threading.Event()
+        try:
+            self._queue.put(written, timeout=timeout)
+        except queue.Full:
+            return False
+        return written.wait(max(0.0, deadline - time.monotonic()))
+    
+    @contextmanager
+    def paused(self):
+        """Hold off batch writes for the duration; entries keep queueing meanwhile"""
+        with self._write_lock:
+            yield
+    
+    def discard_pending(self):
+        """
+        Drop every entry queued so far without writing it, including any
+        the writer has already taken into its current batch
+        Call inside paused() so that no batch is being written meanwhile.
+        """
+        with self._write_lock:
+            self._epoch += 1
+    
+    def _run(self):
+        """Collect entries until the batch fills, flush_interval passes or flush() asks, then write them"""
+        while True:
+            batch = []
+            flushes = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    # Everything queued before this flush() is in hand; write it now
+                    flushes.append(item)
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            
             try:
-                self.create_resource(name, rtype, path, desc, owner)
-            except sqlite3.IntegrityError:
-                # Resource already exists, skip
-                pass
\ No newline at end of file
+                self._write(batch)
+            except Exception as e:
+                print(f"Warning: Failed to write {len(batch)} audit log entries: {e}")
+            finally:
+                for written in flushes:
+                    written.set()
+                for _ in range(len(batch) + len(flushes)):
+                    self._queue.task_done()
+    
+    def _write(self, batch: List[tuple]):
+        """Insert the batch's entries from the current epoch"""
+        with self._write_lock:
+            entries = [entry for epoch, entry in batch if epoch == self._epoch]
+            if entries:
+                self.db_manager.log_access_batch(entries)
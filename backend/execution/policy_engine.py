@@ -5,13 +5,22 @@ Policy Execution Engine - Enforces compiled AuthScript policies
 
 import json
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import re
+import traceback
+
+
+# obj.attr references in a condition, and the string literals to skip when finding them
+CONDITION_ATTRIBUTE_RE = re.compile(r'(\w+)\.(\w+)')
+QUOTED_STRING_RE = re.compile(r'"[^"]*"|\'[^\']*\'')
 
 
 class PolicyEngine:
     """Executes compiled SPL policies and enforces access control"""
     
+    # Distinct (user, action, resource, attribute values) decisions kept per engine
+    DECISION_CACHE_SIZE = 50000
+    
     def __init__(self, compiled_policy: Dict[str, Any]):
         """
         Initialize policy engine with compiled policy
@@ -24,6 +33,12 @@ class PolicyEngine:
         self.users = self._index_users()
         self.resources = self._index_resources()
         self.policies = self._index_policies()
+        self.policies_by_resource = self._index_resource_policies()
+        self.policies_by_target = self._index_target_policies()
+        self.user_applicable_policies = self._index_user_applicable_policies()
+        self.condition_attributes = self._index_condition_attributes()
+        self._decision_cache = {}
+        self._compiled_conditions = {}
         
     def _index_roles(self) -> Dict[str, Any]:
         """Index roles for quick lookup"""
@@ -50,6 +65,46 @@ class PolicyEngine:
         """Get all policies (ALLOW and DENY)"""
         return self.policy.get('policies', [])
     
+    def _index_resource_policies(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Resolve wildcard resource patterns once: map each declared resource
+        to the policies that target it, in policy order
+        """
+        return {
+            resource_name: [
+                policy for policy in self.policies
+                if self._matches_resource(policy['resource'], resource_name)
+            ]
+            for resource_name in self.resources
+        }
+    
+    def _index_target_policies(self) -> Dict[str, Dict[Optional[str], List[Dict[str, Any]]]]:
+        """
+        Resolve action lists once as well: map each resource and each action
+        named by its policies to the policies that apply, in policy order.
+        Any other action is only matched by wildcard policies, kept under None.
+        """
+        targets = {}
+        for resource_name, policies in self.policies_by_resource.items():
+            actions = {action for policy in policies for action in policy['actions']}
+            actions.discard('*')
+            by_action = {
+                action: [policy for policy in policies if self._matches_action(policy['actions'], action)]
+                for action in actions
+            }
+            by_action[None] = [policy for policy in policies if '*' in policy['actions']]
+            targets[resource_name] = by_action
+        return targets
+    
+    def _index_condition_attributes(self) -> Tuple[Tuple[str, str], ...]:
+        """Collect every obj.attr that some policy condition reads, in a fixed order"""
+        attributes = set()
+        for policy in self.policies:
+            condition = policy.get('condition')
+            if condition:
+                attributes.update(CONDITION_ATTRIBUTE_RE.findall(QUOTED_STRING_RE.sub('', condition)))
+        return tuple(sorted(attributes))
+    
     def check_access(self, username: str, action: str, resource_name: str, 
                     context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
@@ -163,41 +218,26 @@ class PolicyEngine:
         print(f"  IP: {eval_context['request']['ip']}")
         print(f"  Device: {eval_context['device']['type']} (trusted: {eval_context['device']['trusted']})")
         
-        # Evaluate policies
-        matched_policies = []
-        deny_found = False
-        allow_found = False
+        # Evaluate policies. The outcome depends only on the request triple and
+        # the context attributes the conditions read, so it is memoized on those.
+        try:
+            cache_key = (username, action, resource_name, tuple(
+                eval_context.get(obj, {}).get(attr) for obj, attr in self.condition_attributes
+            ))
+            hash(cache_key)
+        except TypeError:
+            cache_key = None  # e.g. a condition reading request.headers
         
-        for policy in self.policies:
-            # Check if policy applies to this resource
-            if not self._matches_resource(policy['resource'], resource_name):
-                continue
-            
-            # Check if action matches
-            if not self._matches_action(policy['actions'], action):
-                continue
-            
-            # Evaluate condition
-            condition_result = True
-            if policy.get('condition'):
-                condition_result = self._evaluate_condition(
-                    policy['condition'], 
-                    eval_context
-                )
-                print(f"  Policy {policy['type']} condition '{policy['condition']}' -> {condition_result}")
-            
-            if condition_result:
-                matched_policies.append({
-                    'type': policy['type'],
-                    'actions': policy['actions'],
-                    'resource': policy['resource'],
-                    'condition': policy.get('condition', 'Always')
-                })
-                
-                if policy['type'] == 'DENY':
-                    deny_found = True
-                elif policy['type'] == 'ALLOW':
-                    allow_found = True
+        decision = self._decision_cache.get(cache_key) if cache_key else None
+        if decision is None:
+            decision = self._evaluate_policies(action, resource_name, eval_context)
+            if cache_key:
+                if len(self._decision_cache) >= self.DECISION_CACHE_SIZE:
+                    self._decision_cache.clear()
+                self._decision_cache[cache_key] = decision
+        
+        deny_found, allow_found, matched_policies = decision
+        matched_policies = list(matched_policies)
         
         # Decision logic: DENY overrides ALLOW
         if deny_found:
@@ -225,6 +265,46 @@ class PolicyEngine:
                 'context': eval_context
             }
     
+    def _evaluate_policies(self, action: str, resource_name: str,
+                           eval_context: Dict[str, Any]) -> Tuple[bool, bool, List[Dict[str, Any]]]:
+        """
+        Run every applicable policy against the evaluation context
+        
+        Returns:
+            (deny_found, allow_found, matched_policies)
+        """
+        matched_policies = []
+        deny_found = False
+        allow_found = False
+        
+        # Only policies whose resource pattern and actions match this request
+        by_action = self.policies_by_target.get(resource_name)
+        policies = by_action.get(action, by_action[None]) if by_action else ()
+        for policy in policies:
+            # Evaluate condition
+            condition_result = True
+            if policy.get('condition'):
+                condition_result = self._evaluate_condition(
+                    policy['condition'], 
+                    eval_context
+                )
+                print(f"  Policy {policy['type']} condition '{policy['condition']}' -> {condition_result}")
+            
+            if condition_result:
+                matched_policies.append({
+                    'type': policy['type'],
+                    'actions': policy['actions'],
+                    'resource': policy['resource'],
+                    'condition': policy.get('condition', 'Always')
+                })
+                
+                if policy['type'] == 'DENY':
+                    deny_found = True
+                elif policy['type'] == 'ALLOW':
+                    allow_found = True
+        
+        return deny_found, allow_found, matched_policies
+    
     def _matches_resource(self, policy_resource: str, target_resource: str) -> bool:
         """Check if policy resource matches target resource"""
         # Exact match
@@ -248,6 +328,8 @@ class PolicyEngine:
         Evaluate policy condition against context
         
         Supports: user.role, time.hour, request.ip, device.type, device.trusted, etc.
+        Each condition is translated and compiled once per engine; later
+        checks only run the cached code object.
         
         Args:
             condition: Condition string (e.g., "user.role == 'Admin'")
@@ -257,92 +339,106 @@ class PolicyEngine:
             Boolean result of condition evaluation
         """
         try:
-            eval_str = condition
-            
-            # Split by quotes to avoid replacing inside string literals
-            parts = []
-            in_quote = False
-            current = ""
-            quote_char = None
-            
-            for i, char in enumerate(eval_str):
-                if char in ['"', "'"]:
-                    if not in_quote:
-                        # Process accumulated text before quote
-                        if current:
-                            parts.append(('text', current))
-                            current = ""
-                        in_quote = True
-                        quote_char = char
-                        current = char
-                    elif char == quote_char:
-                        # End of quoted string
-                        current += char
-                        parts.append(('string', current))
-                        current = ""
-                        in_quote = False
-                        quote_char = None
-                    else:
-                        current += char
-                else:
-                    current += char
-            
-            if current:
-                parts.append(('text' if not in_quote else 'string', current))
-            
-            # Replace attribute access only in non-quoted parts
-            def replace_attr(match):
-                obj = match.group(1)
-                attr = match.group(2)
-                
-                # Check if object exists in context
-                if obj not in context:
-                    print(f"⚠️  Warning: Unknown object '{obj}' in condition")
-                    return "False"  # Unknown object evaluates to False
-                
-                # Check if attribute exists
-                if attr not in context[obj]:
-                    print(f"⚠️  Warning: Unknown attribute '{attr}' on '{obj}'")
-                    return "False"  # Unknown attribute evaluates to False
-                
-                return f"context['{obj}']['{attr}']"
-            
-            # Reconstruct string with replacements only in text parts
-            result_parts = []
-            for part_type, part_text in parts:
-                if part_type == 'text':
-                    # Apply regex replacement only to non-quoted text
-                    result_parts.append(re.sub(r'(\w+)\.(\w+)', replace_attr, part_text))
-                else:
-                    # Keep quoted strings as-is
-                    result_parts.append(part_text)
-            
-            eval_str = ''.join(result_parts)
-            
-            # Replace boolean literals
-            eval_str = eval_str.replace(' true', ' True').replace(' false', ' False')
-            eval_str = eval_str.replace('True', 'True').replace('False', 'False')
-            
-            # Replace comparison operators (already correct in Python)
-            eval_str = eval_str.replace('==', '==').replace('!=', '!=')
-            
-            # Replace logical operators
-            eval_str = eval_str.replace(' AND ', ' and ')
-            eval_str = eval_str.replace(' OR ', ' or ')
-            eval_str = eval_str.replace('NOT ', 'not ')
+            compiled = self._compiled_conditions.get(condition)
+            if compiled is None:
+                eval_str = self._translate_condition(condition, context)
+                compiled = (eval_str, compile(eval_str, '<condition>', 'eval'))
+                self._compiled_conditions[condition] = compiled
+            eval_str, code = compiled
             
             print(f"  📝 Evaluating: {eval_str}")
             
             # Safely evaluate with restricted builtins
-            result = eval(eval_str, {"__builtins__": {}}, {"context": context})
+            result = eval(code, {"__builtins__": {}}, {"context": context})
             return bool(result)
             
         except Exception as e:
             print(f"❌ Error evaluating condition '{condition}': {e}")
-            import traceback
             traceback.print_exc()
             return False
     
+    def _translate_condition(self, condition: str, context: Dict[str, Any]) -> str:
+        """
+        Rewrite an SPL condition as a Python expression over `context`
+        Only the keys of context are consulted, and check_access always
+        builds it with the same shape, so the result can be reused
+        """
+        eval_str = condition
+        
+        # Split by quotes to avoid replacing inside string literals
+        parts = []
+        in_quote = False
+        current = ""
+        quote_char = None
+        
+        for i, char in enumerate(eval_str):
+            if char in ['"', "'"]:
+                if not in_quote:
+                    # Process accumulated text before quote
+                    if current:
+                        parts.append(('text', current))
+                        current = ""
+                    in_quote = True
+                    quote_char = char
+                    current = char
+                elif char == quote_char:
+                    # End of quoted string
+                    current += char
+                    parts.append(('string', current))
+                    current = ""
+                    in_quote = False
+                    quote_char = None
+                else:
+                    current += char
+            else:
+                current += char
+        
+        if current:
+            parts.append(('text' if not in_quote else 'string', current))
+        
+        # Replace attribute access only in non-quoted parts
+        def replace_attr(match):
+            obj = match.group(1)
+            attr = match.group(2)
+            
+            # Check if object exists in context
+            if obj not in context:
+                print(f"⚠️  Warning: Unknown object '{obj}' in condition")
+                return "False"  # Unknown object evaluates to False
+            
+            # Check if attribute exists
+            if attr not in context[obj]:
+                print(f"⚠️  Warning: Unknown attribute '{attr}' on '{obj}'")
+                return "False"  # Unknown attribute evaluates to False
+            
+            return f"context['{obj}']['{attr}']"
+        
+        # Reconstruct string with replacements only in text parts
+        result_parts = []
+        for part_type, part_text in parts:
+            if part_type == 'text':
+                # Apply regex replacement only to non-quoted text
+                result_parts.append(re.sub(r'(\w+)\.(\w+)', replace_attr, part_text))
+            else:
+                # Keep quoted strings as-is
+                result_parts.append(part_text)
+        
+        eval_str = ''.join(result_parts)
+        
+        # Replace boolean literals
+        eval_str = eval_str.replace(' true', ' True').replace(' false', ' False')
+        eval_str = eval_str.replace('True', 'True').replace('False', 'False')
+        
+        # Replace comparison operators (already correct in Python)
+        eval_str = eval_str.replace('==', '==').replace('!=', '!=')
+        
+        # Replace logical operators
+        eval_str = eval_str.replace(' AND ', ' and ')
+        eval_str = eval_str.replace(' OR ', ' or ')
+        eval_str = eval_str.replace('NOT ', 'not ')
+        
+        return eval_str
+    
     def get_user_permissions(self, username: str) -> Dict[str, Any]:
         """
         Get all permissions for a user
@@ -366,6 +462,14 @@ class PolicyEngine:
     
     def _get_applicable_policies(self, username: str) -> List[Dict[str, Any]]:
         """Get all policies that could apply to this user"""
+        return list(self.user_applicable_policies)
+    
+    def _index_user_applicable_policies(self) -> List[Dict[str, Any]]:
+        """
+        Policies that could apply to a user: unconditional ones and those
+        conditioned on user.role. This does not depend on the user, so it
+        is computed once per engine.
+        """
         applicable = []
         
         for policy in self.policies:
@@ -0,0 +1,37 @@
+"""
+backend/gunicorn.conf.py
+Production server settings - run from backend/ with `gunicorn`
+"""
+
+# Patch before gunicorn imports anything that touches sockets or threads
+from gevent import monkey
+monkey.patch_all()
+
+import os
+
+wsgi_app = "app:create_app()"
+bind = os.environ.get("SPL_BIND", "0.0.0.0:5000")
+
+# Cooperative workers: greenlets overlap waiting on clients (slow uploads,
+# keep-alive, streamed responses). sqlite3 is a C extension gevent cannot
+# patch, so a query blocks the worker's hub until it returns.
+worker_class = "gevent"
+
+# The active policy engine, read caches, /compile job IDs and the
+# "unchanged source" check all live in the worker process, and a /compile
+# only updates the worker that served it. Run a single worker so every
+# request sees the same policy; raise SPL_WORKERS only behind a proxy that
+# keeps compiles and checks on consistent workers.
+workers = int(os.environ.get("SPL_WORKERS", 1))
+
+# Each worker owns one DatabaseManager whose pool hands out at most
+# pool_size + max_overflow (10 + 20) connections; greenlets beyond that
+# wait on the pool for up to pool_timeout seconds
+worker_connections = int(os.environ.get("SPL_WORKER_CONNECTIONS", 30))
+
+# Load the app after fork so every worker opens its own connections
+# (DatabaseManager and AuditLogWriter also reset themselves on fork)
+preload_app = False
+
+timeout = 30
+keepalive = 5
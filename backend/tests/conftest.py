@@ -0,0 +1,41 @@
+"""
+backend/tests/conftest.py
+Shared test fixtures
+"""
+
+import os
+import sys
+
+# Tests import modules the way the app does when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from database.db_manager import DatabaseManager
+
+
+@pytest.fixture
+def database(tmp_path):
+    """A DatabaseManager on an empty database file of its own"""
+    return DatabaseManager(str(tmp_path / 'spl_test.db'))
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """
+    The Flask app, run from a temporary directory so its database file
+    (spl_database.db, relative to the working directory) stays out of the tree
+    """
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('app'))
+    from app import create_app
+    yield create_app()
+    os.chdir(cwd)
+
+
+@pytest.fixture
+def client(app):
+    """A test client with the read cache emptied before each test"""
+    from api import routes
+    routes.invalidate_read_cache()
+    return app.test_client()
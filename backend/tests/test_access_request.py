@@ -0,0 +1,52 @@
+"""
+backend/tests/test_access_request.py
+Decoding POST /execution/check-access bodies with and without msgspec
+"""
+
+import pytest
+
+from api import routes
+
+REJECTED = (None, None, None, {})
+
+BODIES = [
+    (b'{"username": "Alice", "action": "read", "resource": "DB_Finance"}',
+     ('Alice', 'read', 'DB_Finance', {})),
+    (b'{"username": "Alice", "action": "read", "resource": "DB_Finance", "context": {"device": {"trusted": true}}, "extra": 1}',
+     ('Alice', 'read', 'DB_Finance', {'device': {'trusted': True}})),
+    (b'{"username": "Alice"}', ('Alice', '', '', {})),
+    (b'{}', ('', '', '', {})),
+    (b'', REJECTED),
+    (b'garbage', REJECTED),
+    (b'["Alice", "read", "DB_Finance"]', REJECTED),
+    (b'{"username": 7, "action": "read", "resource": "DB_Finance"}', REJECTED),
+    (b'{"username": null, "action": "read", "resource": "DB_Finance"}', REJECTED),
+    (b'{"username": "Alice", "action": "read", "resource": "DB_Finance", "context": null}', REJECTED),
+    (b'{"username": "Alice", "action": "read", "resource": "DB_Finance", "context": []}', REJECTED),
+]
+INVALID = [body for body, expected in BODIES if not all(expected[:3])]
+
+
+@pytest.fixture(params=['msgspec', 'json'])
+def decoder(request, monkeypatch):
+    """Run the test once per decode path; the msgspec run needs msgspec installed"""
+    if request.param == 'msgspec':
+        pytest.importorskip('msgspec')
+    else:
+        monkeypatch.setattr(routes, 'MSGSPEC_AVAILABLE', False)
+    return request.param
+
+
+@pytest.mark.parametrize('body, expected', BODIES)
+def test_both_paths_decode_the_same(app, decoder, body, expected):
+    with app.test_request_context('/api/execution/check-access', method='POST', data=body,
+                                  content_type='application/json'):
+        assert routes.read_access_request() == expected
+
+
+@pytest.mark.parametrize('body', INVALID)
+def test_incomplete_bodies_are_rejected(client, decoder, body):
+    response = client.post('/api/execution/check-access', data=body, content_type='application/json')
+    
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Missing required fields: username, action, resource'}
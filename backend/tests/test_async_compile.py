@@ -0,0 +1,82 @@
+"""
+backend/tests/test_async_compile.py
+POST /api/compile?async=1 and GET /api/compile/status/<job_id>
+"""
+
+import threading
+import uuid
+
+import pytest
+
+from api import routes
+
+
+def unique_source():
+    """A policy no earlier test compiled, so its rebuild is never skipped"""
+    user = f'User_{uuid.uuid4().hex}'
+    return user, f'''
+ROLE Admin {{ can: * }}
+USER {user} {{ role: Admin }}
+RESOURCE DB_Finance {{ path: "/data/fin" }}
+ALLOW action: read ON RESOURCE: DB_Finance IF (user.role == "Admin")
+'''
+
+
+@pytest.fixture
+def held_worker():
+    """Keep the rebuild worker busy until the returned event is set"""
+    release = threading.Event()
+    blocker = routes.db_executor.submit(release.wait, 5)
+    yield release
+    release.set()
+    blocker.result()
+
+
+def compile_async(client, source):
+    return client.post('/api/compile?async=1', json={'code': source, 'generate_code': True})
+
+
+def status(client, job_id):
+    return client.get(f'/api/compile/status/{job_id}')
+
+
+def test_async_compile_answers_before_the_rebuild(client, held_worker):
+    user, source = unique_source()
+    response = compile_async(client, source)
+    body = response.get_json()
+    
+    assert response.status_code == 202
+    assert body['success']
+    assert body['database_updated'] == 'pending'
+    assert status(client, body['job_id']).get_json()['database_updated'] == 'pending'
+    
+    held_worker.set()
+    routes._db_jobs[body['job_id']].result(timeout=5)
+    assert status(client, body['job_id']).get_json() == {
+        'success': True, 'job_id': body['job_id'], 'database_updated': True
+    }
+    assert client.get(f'/api/execution/users/{user}').status_code == 200
+
+
+def test_failed_rebuild_is_reported(client, monkeypatch):
+    monkeypatch.setattr(routes, 'clear_and_populate_database', lambda *args: False)
+    job_id = compile_async(client, unique_source()[1]).get_json()['job_id']
+    
+    routes._db_jobs[job_id].result(timeout=5)
+    assert status(client, job_id).get_json()['database_updated'] is False
+
+
+def test_unknown_job_is_404(client):
+    response = status(client, 'no-such-job')
+    
+    assert response.status_code == 404
+    assert not response.get_json()['success']
+
+
+def test_job_history_is_bounded(client, monkeypatch):
+    monkeypatch.setattr(routes, 'DB_JOB_HISTORY', 2)
+    monkeypatch.setattr(routes, 'clear_and_populate_database', lambda *args: True)
+    job_ids = [compile_async(client, unique_source()[1]).get_json()['job_id'] for _ in range(3)]
+    
+    assert status(client, job_ids[0]).status_code == 404
+    assert all(status(client, job_id).status_code == 200 for job_id in job_ids[1:])
@@ -0,0 +1,98 @@
+"""
+backend/tests/test_audit_log_writer.py
+Batched audit logging through AuditLogWriter
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from database.db_manager import AuditLogWriter, DatabaseManager
+
+
+def test_flush_makes_queued_rows_visible(database):
+    writer = AuditLogWriter(database, batch_size=50, flush_interval=0.2)
+    
+    for i in range(120):
+        assert writer.submit(username=f"user{i % 3}", action="read", resource="DB_Finance",
+                             allowed=i % 2 == 0, reason="test", device_type="laptop")
+    writer.flush()
+    
+    logs = database.get_audit_logs(limit=-1)
+    assert len(logs) == 120
+    assert sum(1 for log in logs if log["allowed"]) == 60
+    assert {log["username"] for log in logs} == {"user0", "user1", "user2"}
+    assert all(log["device_type"] == "laptop" for log in logs)
+
+
+def test_flush_with_nothing_queued_returns(database):
+    writer = AuditLogWriter(database)
+    
+    writer.flush()
+    
+    assert database.get_audit_logs() == []
+
+
+def submit_one(writer, username="user0"):
+    return writer.submit(username=username, action="read", resource="DB_Finance",
+                         allowed=True, reason="test")
+
+
+def test_flush_returns_while_entries_keep_arriving(database):
+    writer = AuditLogWriter(database, flush_interval=0.05)
+    stop = threading.Event()
+    
+    def traffic():
+        while not stop.is_set():
+            submit_one(writer, "busy")
+    
+    thread = threading.Thread(target=traffic)
+    thread.start()
+    try:
+        submit_one(writer, "before")
+        started = time.monotonic()
+        assert writer.flush(timeout=5)
+        assert time.monotonic() - started < 2
+        assert database.get_audit_logs(username="before")
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_flush_gives_up_after_its_timeout(database):
+    writer = AuditLogWriter(database)
+    
+    with writer.paused():
+        submit_one(writer)
+        assert not writer.flush(timeout=0.2)
+    
+    assert writer.flush()
+
+
+def test_discard_pending_drops_entries_queued_before_it(database):
+    writer = AuditLogWriter(database, flush_interval=0.05)
+    
+    with writer.paused():
+        for _ in range(10):
+            submit_one(writer, "old")
+        time.sleep(0.1)  # let the writer take some of them into its batch
+        writer.discard_pending()
+        submit_one(writer, "new")
+    writer.flush()
+    
+    assert [log["username"] for log in database.get_audit_logs(limit=-1)] == ["new"]
+
+
+def test_queued_entries_are_written_at_exit(tmp_path):
+    db_path = tmp_path / "spl_test.db"
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = (
+        "from database.db_manager import DatabaseManager, AuditLogWriter\n"
+        f"writer = AuditLogWriter(DatabaseManager({str(db_path)!r}), flush_interval=30)\n"
+        "writer.submit(username='late', action='read', resource='DB_Finance', allowed=True, reason='exit')\n"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=backend_dir, check=True, timeout=30)
+    
+    assert [log["username"] for log in DatabaseManager(str(db_path)).get_audit_logs()] == ["late"]
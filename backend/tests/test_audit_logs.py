@@ -0,0 +1,38 @@
+"""
+backend/tests/test_audit_logs.py
+GET /api/execution/audit-logs
+"""
+
+import pytest
+
+SOURCE = '''
+ROLE Admin { can: * }
+USER Alice { role: Admin }
+RESOURCE DB_Finance { path: "/data/fin" }
+ALLOW action: read ON RESOURCE: DB_Finance IF (user.role == "Admin")
+'''
+
+
+@pytest.fixture
+def logged_client(client):
+    assert client.post('/api/compile', json={'code': SOURCE, 'generate_code': True}).get_json()['success']
+    for _ in range(3):
+        client.post('/api/execution/check-access',
+                    json={'username': 'Alice', 'action': 'read', 'resource': 'DB_Finance'})
+    return client
+
+
+def test_limit_caps_the_rows_returned(logged_client):
+    body = logged_client.get('/api/execution/audit-logs?limit=2').get_json()
+    
+    assert body['success']
+    assert body['count'] == len(body['logs']) == 2
+
+
+@pytest.mark.parametrize('limit', ['abc', '', '1.5'])
+def test_malformed_limit_falls_back_to_the_default(logged_client, limit):
+    response = logged_client.get(f'/api/execution/audit-logs?limit={limit}')
+    default = logged_client.get('/api/execution/audit-logs').get_json()
+    
+    assert response.status_code == 200
+    assert response.get_json() == default
@@ -0,0 +1,88 @@
+"""
+backend/tests/test_compile_cache.py
+The per-source compile cache in api/routes.py
+"""
+
+import pytest
+
+from api import routes
+from compiler.lexer import SPLLexer
+from compiler.parser import SPLParser
+
+
+SOURCE = '''
+ROLE Admin { can: * }
+USER Alice { role: Admin }
+RESOURCE DB_Finance { path: "/data/fin" }
+ALLOW action: read ON RESOURCE: DB_Finance IF (user.role == "Admin")
+'''
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    routes._compile_cache.clear()
+    yield
+    routes._compile_cache.clear()
+
+
+def test_cached_results_match_a_fresh_compile():
+    lexer = SPLLexer()
+    lexer.build()
+    parser = SPLParser()
+    parser.build()
+    
+    assert routes.lex_source(SOURCE) == lexer.tokenize(SOURCE)
+    ast, errors = routes.parse_source(SOURCE)
+    
+    assert errors == []
+    assert str(ast) == str(parser.parse(SOURCE))
+    assert routes.analyze_source(SOURCE)["success"]
+
+
+def test_resubmitted_source_reuses_its_entry():
+    ast, _ = routes.parse_source(SOURCE)
+    
+    assert routes.parse_source(SOURCE)[0] is ast
+    assert routes.compile_cache_entry(SOURCE) is routes.compile_cache_entry(SOURCE)
+
+
+def test_parse_errors_are_cached_with_the_source():
+    broken = SOURCE.replace("ALLOW", "ALOW")
+    
+    ast, errors = routes.parse_source(broken)
+    
+    assert ast is None
+    assert errors
+    assert routes.parse_source(broken) == (None, errors)
+
+
+def test_least_recently_used_source_is_evicted(monkeypatch):
+    monkeypatch.setattr(routes, "COMPILE_CACHE_SIZE", 2)
+    first, second, third = (SOURCE + f"\nUSER U{i} {{ role: Admin }}\n" for i in range(3))
+    
+    routes.parse_source(first)
+    routes.parse_source(second)
+    routes.parse_source(first)  # first is now the most recently used
+    routes.parse_source(third)
+    
+    cached = set(routes._compile_cache)
+    assert routes.source_key(first) in cached
+    assert routes.source_key(third) in cached
+    assert routes.source_key(second) not in cached
+
+
+@pytest.mark.parametrize("source", [
+    SOURCE,
+    SOURCE.replace("ALLOW", "ALOW"),
+    "",
+    "@@ " + SOURCE
+])
+def test_parse_records_the_tokens_tokenize_produces(source):
+    lexer = SPLLexer()
+    lexer.build()
+    
+    routes.parse_source(source)
+    
+    # The parse ran first, so these are the tokens it recorded
+    assert 'lexed' in routes.compile_cache_entry(source)
+    assert routes.lex_source(source) == lexer.tokenize(source)
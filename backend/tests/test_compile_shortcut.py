@@ -0,0 +1,98 @@
+"""
+backend/tests/test_compile_shortcut.py
+Skipping the database rebuild when /compile gets the active source again
+"""
+
+import threading
+import uuid
+
+import pytest
+
+from api import routes
+
+
+def unique_source():
+    """A policy no earlier test compiled"""
+    return f'''
+ROLE Admin {{ can: * }}
+USER User_{uuid.uuid4().hex} {{ role: Admin }}
+RESOURCE DB_Finance {{ path: "/data/fin" }}
+ALLOW action: read ON RESOURCE: DB_Finance IF (user.role == "Admin")
+'''
+
+
+@pytest.fixture
+def rebuilds(monkeypatch):
+    """Sources passed to clear_and_populate_database, in call order"""
+    calls = []
+    populate = routes.clear_and_populate_database
+    
+    def spy(ast, source_code, *args):
+        calls.append(source_code)
+        return populate(ast, source_code, *args)
+    monkeypatch.setattr(routes, 'clear_and_populate_database', spy)
+    return calls
+
+
+def compile_source(client, source, query=''):
+    return client.post(f'/api/compile{query}', json={'code': source, 'generate_code': True}).get_json()
+
+
+def test_unchanged_source_skips_the_rebuild(client, rebuilds):
+    source = unique_source()
+    first = compile_source(client, source)
+    second = compile_source(client, source)
+    
+    assert rebuilds == [source]
+    assert first['database_updated'] is True
+    assert second['database_updated'] is False
+    assert second['cache_hit']
+    assert second['stages']['code_generation'] == first['stages']['code_generation']
+
+
+def test_force_rebuilds_anyway(client, rebuilds):
+    source = unique_source()
+    compile_source(client, source)
+    
+    assert compile_source(client, source, '?force=1')['database_updated'] is True
+    assert rebuilds == [source, source]
+
+
+def test_another_compile_invalidates_the_shortcut(client, rebuilds):
+    first, second = unique_source(), unique_source()
+    for source in (first, second, first):
+        assert compile_source(client, source)['database_updated'] is True
+    
+    assert rebuilds == [first, second, first]
+
+
+def test_failed_rebuild_is_not_remembered(client, rebuilds, monkeypatch):
+    source = unique_source()
+    monkeypatch.setattr(routes, 'clear_and_populate_database', lambda *args: False)
+    
+    assert compile_source(client, source)['database_updated'] is False
+    assert routes._last_compile == (None, None)
+
+
+def test_queued_rebuild_clears_the_shortcut_and_only_the_newest_sets_it(client, rebuilds):
+    current, older, newest = unique_source(), unique_source(), unique_source()
+    compile_source(client, current)
+    
+    # Worker order: hold, older, hold, newest
+    holds = []
+    jobs = []
+    for source in (older, newest):
+        holds.append(threading.Event())
+        routes.db_executor.submit(holds[-1].wait, 5)
+        jobs.append(compile_source(client, source, '?async=1')['job_id'])
+    assert routes._last_compile == (None, None)
+    
+    holds[0].set()
+    routes._db_jobs[jobs[0]].result(timeout=5)
+    assert routes._last_compile == (None, None)
+    
+    holds[1].set()
+    routes._db_jobs[jobs[1]].result(timeout=5)
+    assert routes._last_compile[0] == routes.source_key(newest)
+    assert compile_source(client, older)['database_updated'] is True
+    assert rebuilds == [current, older, newest, older]
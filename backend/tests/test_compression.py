@@ -0,0 +1,53 @@
+"""
+backend/tests/test_compression.py
+Gzip for large API responses (compress_response in api/routes.py)
+"""
+
+import gzip
+
+import pytest
+
+from api import routes
+
+LARGE_SOURCE = '\n'.join(f'USER User{n} {{ role: Admin }}' for n in range(200))
+SMALL_SOURCE = 'ROLE Admin { can: * }'
+
+
+def tokenize(client, source, **headers):
+    return client.post('/api/tokenize', json={'code': source}, headers=headers)
+
+
+def test_large_body_is_gzipped_for_clients_that_accept_it(client):
+    plain = tokenize(client, LARGE_SOURCE)
+    compressed = tokenize(client, LARGE_SOURCE, **{'Accept-Encoding': 'gzip, deflate'})
+    
+    assert len(plain.get_data()) >= routes.GZIP_MIN_SIZE
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
+
+
+def test_large_body_is_plain_without_accept_encoding(client):
+    response = tokenize(client, LARGE_SOURCE)
+    
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+def test_small_body_is_never_gzipped(client):
+    response = tokenize(client, SMALL_SOURCE, **{'Accept-Encoding': 'gzip'})
+    
+    assert len(response.get_data()) < routes.GZIP_MIN_SIZE
+    assert 'Content-Encoding' not in response.headers
+
+
+@pytest.mark.parametrize('accept', ['gzip', 'identity'])
+def test_revalidation_still_works(client, monkeypatch, accept):
+    monkeypatch.setattr(routes, 'GZIP_MIN_SIZE', 1)
+    headers = {'Accept-Encoding': accept}
+    etag = client.get('/api/health', headers=headers).headers['ETag']
+    
+    headers['If-None-Match'] = etag
+    response = client.get('/api/health', headers=headers)
+    assert response.status_code == 304
+    assert 'Content-Encoding' not in response.headers
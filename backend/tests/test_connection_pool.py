@@ -0,0 +1,61 @@
+"""
+backend/tests/test_connection_pool.py
+DatabaseManager's bounded connection pool
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import ExitStack
+
+import pytest
+
+from database.db_manager import DatabaseManager
+
+
+@pytest.fixture
+def small_pool(tmp_path):
+    """Two connections at most: one pooled, one overflow"""
+    return DatabaseManager(str(tmp_path / 'spl_pool.db'), pool_size=1,
+                           max_overflow=1, pool_timeout=0.2)
+
+
+def test_exhausted_pool_times_out(small_pool):
+    with ExitStack() as leases:
+        leases.enter_context(small_pool.get_connection())
+        leases.enter_context(small_pool.get_connection())
+        
+        start = time.monotonic()
+        with pytest.raises(sqlite3.OperationalError, match='pool exhausted'):
+            with small_pool.get_connection():
+                pass
+        assert 0.2 <= time.monotonic() - start < 2
+
+
+def test_waiter_gets_a_connection_once_one_is_returned(small_pool):
+    leases = ExitStack()
+    leases.enter_context(small_pool.get_connection())
+    leases.enter_context(small_pool.get_connection())
+    threading.Timer(0.05, leases.close).start()
+    
+    with small_pool.get_connection() as conn:
+        assert conn.execute('SELECT 1').fetchone()[0] == 1
+
+
+def test_timed_out_caller_does_not_leak_a_slot(small_pool):
+    with small_pool.get_connection(), small_pool.get_connection():
+        with pytest.raises(sqlite3.OperationalError):
+            with small_pool.get_connection():
+                pass
+    
+    with small_pool.get_connection(), small_pool.get_connection():
+        pass
+
+
+def test_connections_are_reused(small_pool):
+    with small_pool.get_connection() as first:
+        pass
+    with small_pool.get_connection() as second:
+        pass
+    
+    assert first is second
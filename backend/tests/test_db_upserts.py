@@ -0,0 +1,50 @@
+"""
+backend/tests/test_db_upserts.py
+INSERT ... ON CONFLICT DO NOTHING in DatabaseManager
+"""
+
+
+def test_create_user_returns_the_new_id(database):
+    user_id = database.create_user('Alice', 'Admin', email='alice@example.com')
+    
+    assert user_id is not None
+    assert database.get_user('Alice')['id'] == user_id
+
+
+def test_existing_username_is_left_alone(database):
+    database.create_user('Alice', 'Admin', email='alice@example.com')
+    
+    assert database.create_user('Alice', 'Guest') is None
+    user = database.get_user('Alice')
+    assert (user['role'], user['email']) == ('Admin', 'alice@example.com')
+    assert len(database.get_all_users()) == 1
+
+
+def test_create_resource_returns_the_new_id_once(database):
+    resource_id = database.create_resource('DB_Finance', 'database', '/data/fin')
+    
+    assert resource_id is not None
+    assert database.create_resource('DB_Finance', 'api', '/other') is None
+    resource = database.get_resource('DB_Finance')
+    assert (resource['id'], resource['path']) == (resource_id, '/data/fin')
+
+
+def test_rebuild_skips_duplicate_declarations(database):
+    users = [
+        {'username': 'Alice', 'role': 'Admin'},
+        {'username': 'Alice', 'role': 'Guest'},
+        {'username': 'Bob', 'role': 'Guest'},
+    ]
+    resources = [
+        {'name': 'DB_Finance', 'type': 'database', 'path': '/data/fin'},
+        {'name': 'DB_Finance', 'type': 'api', 'path': '/other'},
+    ]
+    
+    users_created, resources_created, policy_id = database.replace_policy_data(
+        users, resources, 'test_policy', '// source', '{}'
+    )
+    
+    assert (users_created, resources_created) == (2, 1)
+    assert database.get_active_policy('test_policy')['id'] == policy_id
+    assert database.get_user('Alice')['role'] == 'Admin'
+    assert database.get_resource('DB_Finance')['path'] == '/data/fin'
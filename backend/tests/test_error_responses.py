@@ -0,0 +1,29 @@
+"""
+backend/tests/test_error_responses.py
+JSON bodies for errors raised inside API routes
+"""
+
+import pytest
+
+from api import routes
+
+
+@pytest.fixture
+def broken_parser(monkeypatch):
+    def parse_source(source_code):
+        raise RuntimeError('parser exploded')
+    monkeypatch.setattr(routes, 'parse_source', parse_source)
+
+
+def test_validate_keeps_its_valid_flag(client, broken_parser):
+    response = client.post('/api/validate', json={'code': 'ROLE Admin { can: * }'})
+    
+    assert response.status_code == 500
+    assert response.get_json() == {'valid': False, 'error': 'parser exploded'}
+
+
+def test_other_routes_report_success_false(client, broken_parser):
+    response = client.post('/api/analyze', json={'code': 'ROLE Admin { can: * }'})
+    
+    assert response.status_code == 500
+    assert response.get_json() == {'success': False, 'error': 'parser exploded'}
@@ -0,0 +1,47 @@
+"""
+backend/tests/test_policy_details.py
+Stored policy lookups (load_policy_details, engine_for_policy) and
+GET /api/execution/policies/<id>
+"""
+
+import pytest
+
+from api import routes
+
+COMPILED_JSON = '{"roles": {}, "users": [], "resources": [], "policies": []}'
+
+
+@pytest.fixture
+def policy_id(client):
+    return routes.db.save_compiled_policy('details_test', '// details', COMPILED_JSON)
+
+
+def test_missing_version_is_not_remembered(client):
+    missing = routes.db.save_compiled_policy('details_probe', '// probe', COMPILED_JSON) + 1
+    
+    assert client.get(f'/api/execution/policies/{missing}').status_code == 404
+    assert routes.db.save_compiled_policy('details_late', '// late', COMPILED_JSON) == missing
+    assert client.get(f'/api/execution/policies/{missing}').status_code == 200
+
+
+def test_callers_get_their_own_copy(client, policy_id):
+    first = routes.load_policy_details(policy_id, include_body=True)
+    first['name'] = 'changed'
+    first['compiled_json']['policies'].append('changed')
+    
+    second = routes.load_policy_details(policy_id, include_body=True)
+    assert second['name'] == 'details_test'
+    assert second['compiled_json']['policies'] == []
+
+
+def test_unparsable_body_is_served_as_text(client):
+    policy_id = routes.db.save_compiled_policy('details_text', '// text', 'not json')
+    
+    body = client.get(f'/api/execution/policies/{policy_id}?include_body=1').get_json()
+    assert body['policy']['compiled_json'] == 'not json'
+
+
+def test_engine_for_missing_version_raises(client):
+    with pytest.raises(LookupError):
+        routes.engine_for_policy(-1)
+    assert -1 not in routes._engine_cache
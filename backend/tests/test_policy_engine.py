@@ -0,0 +1,105 @@
+"""
+backend/tests/test_policy_engine.py
+PolicyEngine decisions: memoized results, DENY precedence and the
+per-resource/action policy index
+"""
+
+import itertools
+
+import pytest
+
+from execution.policy_engine import PolicyEngine
+
+
+COMPILED_POLICY = {
+    "roles": [
+        {"name": "Admin", "properties": {"can": ["*"]}},
+        {"name": "Dev", "properties": {"can": ["read", "write"]}}
+    ],
+    "users": [
+        {"name": "Alice", "properties": {"role": "Admin"}},
+        {"name": "Bob", "properties": {"role": "Dev"}}
+    ],
+    "resources": [
+        {"name": "DB_Finance", "properties": {"path": "/data/fin"}},
+        {"name": "DB_Reports", "properties": {"path": "/data/reports"}},
+        {"name": "API_Users", "properties": {"path": "/api/users"}}
+    ],
+    "policies": [
+        {"type": "ALLOW", "actions": ["read", "write"], "resource": "DB_*",
+         "condition": 'user.role == "Admin"'},
+        {"type": "DENY", "actions": ["*"], "resource": "DB_Finance",
+         "condition": "time.hour > 22"},
+        {"type": "ALLOW", "actions": ["read"], "resource": "API_Users",
+         "condition": None},
+        {"type": "DENY", "actions": ["delete"], "resource": "*",
+         "condition": "device.trusted == False"},
+        {"type": "ALLOW", "actions": ["*"], "resource": "DB_Reports",
+         "condition": 'device.type == "laptop" AND time.hour >= 9'}
+    ]
+}
+
+USERS = ["Alice", "Bob"]
+ACTIONS = ["read", "write", "delete", "export"]
+RESOURCES = ["DB_Finance", "DB_Reports", "API_Users"]
+CONTEXTS = [
+    {"time": {"hour": hour, "minute": 0},
+     "device": {"type": device_type, "trusted": trusted}}
+    for hour in (3, 9, 22, 23)
+    for device_type in ("laptop", "phone")
+    for trusted in (True, False)
+]
+
+
+def decision_of(result):
+    """The parts of a check_access result that the memo must reproduce"""
+    return result["allowed"], result["decision"], result["matched_policies"]
+
+
+def test_memoized_decisions_match_uncached_ones():
+    engine = PolicyEngine(COMPILED_POLICY)
+    
+    # Twice over, so the second pass is served from the decision cache while
+    # the time and device values keep changing between calls
+    for _ in range(2):
+        for username, action, resource, context in itertools.product(USERS, ACTIONS, RESOURCES, CONTEXTS):
+            expected = PolicyEngine(COMPILED_POLICY).check_access(username, action, resource, context)
+            actual = engine.check_access(username, action, resource, context)
+            assert decision_of(actual) == decision_of(expected), (username, action, resource, context)
+    
+    assert engine._decision_cache
+
+
+def test_memo_follows_context_changes():
+    engine = PolicyEngine(COMPILED_POLICY)
+    day = {"time": {"hour": 10}, "device": {"trusted": True}}
+    night = {"time": {"hour": 23}, "device": {"trusted": True}}
+    
+    assert engine.check_access("Alice", "read", "DB_Finance", day)["allowed"]
+    assert not engine.check_access("Alice", "read", "DB_Finance", night)["allowed"]
+    assert engine.check_access("Alice", "read", "DB_Finance", day)["allowed"]
+
+
+@pytest.mark.parametrize("action", ["read", "write"])
+def test_deny_overrides_allow(action):
+    engine = PolicyEngine(COMPILED_POLICY)
+    
+    result = engine.check_access("Alice", action, "DB_Finance",
+                                 {"time": {"hour": 23}, "device": {"trusted": True}})
+    
+    assert not result["allowed"]
+    assert result["decision"] == "DENY"
+    assert {policy["type"] for policy in result["matched_policies"]} == {"ALLOW", "DENY"}
+
+
+def test_policies_by_target_matches_a_full_scan():
+    engine = PolicyEngine(COMPILED_POLICY)
+    
+    for resource, action in itertools.product(RESOURCES, ACTIONS + ["*", "unknown"]):
+        expected = [
+            policy for policy in engine.policies
+            if engine._matches_resource(policy["resource"], resource)
+            and engine._matches_action(policy["actions"], action)
+        ]
+        by_action = engine.policies_by_target[resource]
+        assert by_action.get(action, by_action[None]) == expected, (resource, action)
@@ -0,0 +1,54 @@
+"""
+backend/tests/test_policy_history.py
+GET /api/execution/policies/<name>/history
+"""
+
+import uuid
+
+import pytest
+
+from api import routes
+
+
+@pytest.fixture
+def history(client):
+    """
+    Store five versions of a fresh policy and return a function that
+    fetches a page of its history as ([versions], total_versions)
+    """
+    name = f'history_{uuid.uuid4().hex}'
+    for version in range(5):
+        routes.db.save_compiled_policy(name, f'// v{version}', '{}')
+    
+    def fetch(query=''):
+        body = client.get(f'/api/execution/policies/{name}/history?{query}').get_json()
+        return [version['version'] for version in body['versions']], body['total_versions']
+    return fetch
+
+
+def test_pages_walk_the_history_newest_first(history):
+    everything, total = history('limit=500')
+    
+    assert total == 5
+    assert everything == sorted(everything, reverse=True)
+    assert history('limit=2') == (everything[:2], total)
+    assert history('limit=2&offset=2') == (everything[2:4], total)
+    assert history(f'offset={total}') == ([], total)
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('limit=-1', slice(0, 1)),
+    ('limit=0', slice(0, 1)),
+    ('limit=1&offset=-5', slice(0, 1)),
+    ('limit=abc&offset=abc', slice(0, 50)),
+])
+def test_out_of_range_paging_is_clamped(history, query, expected):
+    everything, total = history('limit=500')
+    
+    assert history(query) == (everything[expected], total)
+
+
+def test_limit_is_capped(history, monkeypatch):
+    monkeypatch.setattr(routes, 'POLICY_HISTORY_MAX_LIMIT', 2)
+    
+    assert len(history('limit=1000')[0]) == 2
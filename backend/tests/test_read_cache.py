@@ -0,0 +1,67 @@
+"""
+backend/tests/test_read_cache.py
+The read-endpoint cache and conditional responses in api/routes.py
+"""
+
+from api import routes
+
+
+def test_cache_forgets_least_recently_used_entries(monkeypatch):
+    monkeypatch.setattr(routes, 'READ_CACHE_SIZE', 2)
+    routes.invalidate_read_cache()
+    calls = []
+    
+    def producer(key):
+        return lambda: calls.append(key) or key
+    
+    routes.cached_payload('a', producer('a'))
+    routes.cached_payload('b', producer('b'))
+    routes.cached_payload('a', producer('a'))
+    routes.cached_payload('c', producer('c'))
+    
+    assert list(routes._read_cache) == ['a', 'c']
+    assert calls == ['a', 'b', 'c']
+    routes.invalidate_read_cache()
+
+
+def test_unchanged_payload_is_not_modified(client):
+    response = client.get('/api/health')
+    etag = response.headers['ETag']
+    
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    
+    revalidated = client.get('/api/health', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.get_data() == b''
+
+
+def test_stale_etag_gets_the_full_body(client):
+    response = client.get('/api/health', headers={'If-None-Match': '"stale"'})
+    
+    assert response.status_code == 200
+    assert response.get_json()['status']
+
+
+def test_misses_are_bounded_and_kept_apart(monkeypatch):
+    monkeypatch.setattr(routes, 'LOOKUP_MISS_CACHE_SIZE', 2)
+    routes.invalidate_read_cache()
+    routes.cached_payload('users', lambda: ['Alice'])
+    
+    for name in ('x', 'y', 'z'):
+        assert routes.cached_payload(f'user:{name}', lambda: None, miss_ttl=5) is None
+    
+    assert list(routes._lookup_misses) == ['user:y', 'user:z']
+    assert list(routes._read_cache) == ['users']
+    routes.invalidate_read_cache()
+
+
+def test_expired_miss_is_dropped(monkeypatch):
+    routes.invalidate_read_cache()
+    routes.cached_payload('user:x', lambda: None, miss_ttl=5)
+    clock = routes.time.monotonic() + 10
+    monkeypatch.setattr(routes.time, 'monotonic', lambda: clock)
+    
+    assert routes.cached_payload('user:x', lambda: {'username': 'x'}, miss_ttl=5) == {'username': 'x'}
+    assert 'user:x' not in routes._lookup_misses
+    routes.invalidate_read_cache()
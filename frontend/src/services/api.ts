@@ -54,7 +54,8 @@ class ApiService {
         code, 
         analyze, 
         generate_code: generateCode,
-        format 
+        format,
+        include_ast: true
       }),
     });
   }